@@ -1,6 +1,24 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Course, Enrollment, Payment, Assignment, Submission, Feedback, Attendance
+from django.db import connection
+from django.utils import timezone
+from .models import User, Course, Enrollment, Payment, Assignment, Submission, Feedback, Attendance, Task
+from .pagination import EstimatedCountPaginator
+from .replica import ReplicaChangeListMixin
+from .search import matching_ids
+
+
+class LargeTableAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    """
+    Admin for tables that grow with enrollments. Changelists read from the
+    replica and show an estimated count instead of running COUNT(*), once
+    for the page and again for the unfiltered total. Subclasses set
+    list_select_related to cover their list_display and use autocomplete
+    widgets for foreign keys, so neither lists nor forms load related rows
+    one by one or all at once.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(User)
@@ -22,54 +40,98 @@ class UserAdmin(BaseUserAdmin):
 class CourseAdmin(admin.ModelAdmin):
     list_display = ['name', 'trainer', 'duration_weeks', 'difficulty_level', 'fee', 'is_active', 'created_at']
     list_filter = ['difficulty_level', 'is_active', 'created_at']
+    list_select_related = ['trainer']
     search_fields = ['name', 'description']
     list_editable = ['is_active']
+    autocomplete_fields = ['trainer']
     date_hierarchy = 'created_at'
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Use the FTS5 index instead of LIKE '%term%' scans when it is available.
+        if search_term and connection.vendor == 'sqlite':
+            ids = matching_ids(search_term, 'course')
+            return (queryset.none() if ids is None else queryset.filter(id__in=ids)), False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(LargeTableAdmin):
     list_display = ['student', 'course', 'status', 'progress_percentage', 'enrollment_date']
     list_filter = ['status', 'enrollment_date']
+    list_select_related = ['student', 'course']
     search_fields = ['student__username', 'course__name']
     date_hierarchy = 'enrollment_date'
+    autocomplete_fields = ['student', 'course']
+    
+    def get_queryset(self, request):
+        # Autocomplete results for payment and attendance forms are labelled with __str__.
+        return super().get_queryset(request).select_related('student', 'course')
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdmin):
     list_display = ['enrollment', 'amount', 'payment_method', 'status', 'transaction_id', 'payment_date']
     list_filter = ['status', 'payment_method', 'payment_date']
+    list_select_related = ['enrollment__student', 'enrollment__course']
     search_fields = ['transaction_id', 'enrollment__student__username']
     date_hierarchy = 'payment_date'
+    autocomplete_fields = ['enrollment']
 
 
 @admin.register(Assignment)
 class AssignmentAdmin(admin.ModelAdmin):
     list_display = ['title', 'course', 'created_by', 'due_date', 'max_marks', 'created_at']
     list_filter = ['course', 'created_at', 'due_date']
+    list_select_related = ['course', 'created_by']
     search_fields = ['title', 'course__name']
     date_hierarchy = 'due_date'
+    autocomplete_fields = ['course', 'created_by']
+    
+    def get_queryset(self, request):
+        # Autocomplete results for submission forms are labelled with __str__.
+        return super().get_queryset(request).select_related('course')
 
 
 @admin.register(Submission)
-class SubmissionAdmin(admin.ModelAdmin):
+class SubmissionAdmin(LargeTableAdmin):
     list_display = ['assignment', 'student', 'submitted_at', 'marks_obtained', 'graded_by']
     list_filter = ['submitted_at', 'graded_at']
+    list_select_related = ['assignment__course', 'student', 'graded_by']
     search_fields = ['student__username', 'assignment__title']
     date_hierarchy = 'submitted_at'
+    autocomplete_fields = ['assignment', 'student', 'graded_by']
 
 
 @admin.register(Feedback)
-class FeedbackAdmin(admin.ModelAdmin):
+class FeedbackAdmin(LargeTableAdmin):
     list_display = ['student', 'course', 'rating', 'created_at']
     list_filter = ['rating', 'created_at']
+    list_select_related = ['student', 'course']
     search_fields = ['student__username', 'course__name', 'comment']
     date_hierarchy = 'created_at'
+    autocomplete_fields = ['student', 'course']
 
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(LargeTableAdmin):
     list_display = ['enrollment', 'date', 'status', 'marked_by']
     list_filter = ['status', 'date']
+    list_select_related = ['enrollment__student', 'enrollment__course', 'marked_by']
     search_fields = ['enrollment__student__username', 'enrollment__course__name']
-    date_hierarchy = 'date'
\ No newline at end of file
+    date_hierarchy = 'date'
+    autocomplete_fields = ['enrollment', 'marked_by']
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'last_error']
+    readonly_fields = ['claimed_by', 'claimed_at', 'created_at', 'finished_at', 'last_error']
+    actions = ['retry']
+    
+    @admin.action(description='Queue selected tasks to run again now')
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', run_at=timezone.now(), attempts=0, finished_at=None)
+        self.message_user(request, f'{updated} task(s) queued.')
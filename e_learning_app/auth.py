@@ -0,0 +1,132 @@
+"""
+Cheap authentication for every request.
+
+PrincipalAuthenticationMiddleware (in middleware.py) resolves request.user
+from a cached principal: the few User columns that pages read, plus the
+session auth hash needed to honour password changes. With sessions in the
+cached_db engine, an authenticated request normally reaches its view
+without a single query. Anything the cache cannot vouch for falls back to
+django.contrib.auth.get_user, which also flushes invalid sessions.
+
+Views check the role with @role_required instead of repeating the
+user_type test.
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import auth, messages
+from django.contrib.auth.decorators import login_required
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.utils.crypto import constant_time_compare
+
+from .models import User
+
+PRINCIPAL_CACHE = 'auth'
+# Short, because a fill racing a User save can cache the old row until it expires.
+PRINCIPAL_TIMEOUT = 5 * 60
+# What requests read from request.user: the role, the navbar and the admin's gate.
+PRINCIPAL_FIELDS = ('id', 'username', 'user_type', 'profile_picture', 'is_active', 'is_staff', 'is_superuser')
+# Columns whose change makes a cached principal stale.
+PRINCIPAL_SOURCE_FIELDS = frozenset(PRINCIPAL_FIELDS) | {'password'}
+# Sessions from other backends may depend on backend.get_user(); they take the slow path.
+TRUSTED_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+def _cache():
+    return caches[PRINCIPAL_CACHE]
+
+
+def _key(user_id):
+    return f'principal:{user_id}'
+
+
+def get_principal(user_id):
+    """One user's principal as a dict, from the cache or a single query; None for an unknown id."""
+    key = _key(user_id)
+    principal = _cache().get(key)
+    if principal is None:
+        # Always from the primary: a lagging replica could cache an old role or password.
+        principal = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values(*PRINCIPAL_FIELDS, 'password').first()
+        if principal is None:
+            return None
+        principal['session_hash'] = User(password=principal.pop('password')).get_session_auth_hash()
+        _cache().set(key, principal, PRINCIPAL_TIMEOUT)
+    return principal
+
+
+def invalidate_principal(user_id):
+    _cache().delete(_key(user_id))
+
+
+def principal_user(principal, using=DEFAULT_DB_ALIAS):
+    """A User with the principal's columns loaded; any other field is fetched on first access."""
+    # from_db() pairs a partial row with the fields in model order.
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in PRINCIPAL_FIELDS]
+    return User.from_db(using, fields, [principal[field] for field in fields])
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _principal_user(request) or auth.get_user(request)
+    return request._cached_user
+
+
+async def aget_user(request):
+    return await sync_to_async(get_user)(request)
+
+
+def _principal_user(request):
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    if user_id is None or session.get(auth.BACKEND_SESSION_KEY) != TRUSTED_BACKEND:
+        return None
+    try:
+        principal = get_principal(User._meta.pk.to_python(user_id))
+    except ValidationError:
+        return None
+    if principal is None:
+        return None
+    if not principal['is_active'] or not constant_time_compare(session.get(auth.HASH_SESSION_KEY, ''),
+                                                               principal['session_hash']):
+        # Either the session is stale or the principal is; drop the cached
+        # copy so it is rebuilt from the row next time.
+        invalidate_principal(principal['id'])
+        return None
+    return principal_user(principal)
+
+
+def role_required(*roles, json=False):
+    """
+    login_required plus a check that the user's user_type is one of
+    ``roles``. Anyone else is sent home with 'Access denied.', or gets a 403
+    JSON error with ``json=True``. Works on sync and async views.
+    """
+    def denied(request):
+        if json:
+            return JsonResponse({'error': 'Access denied.'}, status=403)
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                if user.user_type not in roles:
+                    return denied(request)
+                # Swap the lazy request.user for the loaded one, so the view
+                # and its template (rendered in a worker thread) reuse it.
+                request.user = user
+                return await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                if request.user.user_type not in roles:
+                    return denied(request)
+                return view(request, *args, **kwargs)
+        return login_required(wrapper)
+    return decorator
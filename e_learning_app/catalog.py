@@ -0,0 +1,62 @@
+import time
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+from .models import Course
+
+CATALOG_CACHE = 'catalog'
+CATALOG_TIMEOUT = 60 * 60
+VERSION_KEY = 'catalog:version'
+
+
+class Catalog(NamedTuple):
+    version: int
+    courses: list
+
+
+def _cache():
+    return caches[CATALOG_CACHE]
+
+
+def catalog_version():
+    """
+    Current catalog version. Every Course write bumps it, so entries cached
+    under an older version are simply never read again. A missing key starts
+    from a timestamp rather than 1 so it cannot collide with old entries.
+    """
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def active_catalog():
+    """All active courses (default ordering), cached per catalog version."""
+    version = catalog_version()
+    key = f'catalog:{version}:active'
+    courses = _cache().get(key)
+    if courses is None:
+        courses = list(Course.objects.filter(is_active=True))
+        _cache().set(key, courses, CATALOG_TIMEOUT)
+    return Catalog(version, courses)
+
+
+aactive_catalog = sync_to_async(active_catalog)
+
+
+def available_courses(catalog, enrolled_course_ids):
+    """Active courses the student is not enrolled in, as a set difference on the cached catalog."""
+    enrolled = set(enrolled_course_ids)
+    return [course for course in catalog.courses if course.id not in enrolled]
+
+
+def invalidate_catalog():
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,134 @@
+import csv
+import datetime
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+from .models import Payment, Enrollment, Attendance, Submission
+
+CHUNK_SIZE = 2000
+
+
+class Export:
+    def __init__(self, model, columns, date_field, course_field, status_filters=None):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+        self.course_field = course_field
+        self.status_filters = status_filters
+
+    def header(self):
+        return [column.replace('__', '_') for column in self.columns]
+
+    def status_choices(self):
+        if self.status_filters:
+            return list(self.status_filters)
+        return [value for value, _ in self.model._meta.get_field('status').choices]
+
+    def queryset(self, start=None, end=None, course=None, status=None):
+        queryset = self.model.objects.order_by('pk')
+        is_datetime = isinstance(self.model._meta.get_field(self.date_field), models.DateTimeField)
+        if start:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': _day_start(start) if is_datetime else start})
+        if end:
+            if is_datetime:
+                queryset = queryset.filter(**{f'{self.date_field}__lt': _day_start(end + datetime.timedelta(days=1))})
+            else:
+                queryset = queryset.filter(**{f'{self.date_field}__lte': end})
+        if course:
+            queryset = queryset.filter(**{self.course_field: course})
+        if status:
+            if self.status_filters:
+                queryset = queryset.filter(self.status_filters[status])
+            else:
+                queryset = queryset.filter(status=status)
+        return queryset.values_list(*self.columns)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+EXPORTS = {
+    'payments': Export(
+        Payment,
+        ['id', 'enrollment__student__username', 'enrollment__course__name', 'amount',
+         'payment_method', 'transaction_id', 'status', 'payment_date'],
+        date_field='payment_date', course_field='enrollment__course',
+    ),
+    'enrollments': Export(
+        Enrollment,
+        ['id', 'student__username', 'course__name', 'status', 'progress_percentage', 'enrollment_date'],
+        date_field='enrollment_date', course_field='course',
+    ),
+    'attendance': Export(
+        Attendance,
+        ['id', 'enrollment__student__username', 'enrollment__course__name', 'date', 'status', 'marked_by__username'],
+        date_field='date', course_field='enrollment__course',
+    ),
+    'submissions': Export(
+        Submission,
+        ['id', 'assignment__title', 'assignment__course__name', 'student__username', 'submitted_at',
+         'marks_obtained', 'graded_by__username', 'graded_at'],
+        date_field='submitted_at', course_field='assignment__course',
+        status_filters={
+            'graded': models.Q(marks_obtained__isnull=False),
+            'pending': models.Q(marks_obtained__isnull=True),
+        },
+    ),
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _encoder(export, fmt):
+    """(header line or None, function encoding one row as a line) for ``fmt``."""
+    header = export.header()
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        return writer.writerow(header), writer.writerow
+    return None, lambda row: json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_rows(export, rows, fmt):
+    """
+    Yield the export one encoded line at a time. The header goes out before
+    the query runs, and rows are read from a server-side iterator in
+    CHUNK_SIZE batches, so memory use does not grow with the table.
+    """
+    header, encode = _encoder(export, fmt)
+    if header is not None:
+        yield header
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield encode(row)
+
+
+async def astream_rows(export, rows, fmt):
+    """
+    Async version of stream_rows() for requests served over ASGI. Django's
+    ASGI handler reads a sync iterator to the end before sending anything,
+    so only an async one actually streams there.
+    """
+    header, encode = _encoder(export, fmt)
+    if header is not None:
+        yield header
+    # QuerySet.aiterator() runs values_list() queries on the event loop, so
+    # step the sync iterator one chunk at a time in the ORM's thread instead.
+    iterator = rows.iterator(chunk_size=CHUNK_SIZE)
+    while chunk := await sync_to_async(list)(islice(iterator, CHUNK_SIZE)):
+        for row in chunk:
+            yield encode(row)
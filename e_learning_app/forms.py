@@ -1,6 +1,10 @@
+import csv
+import io
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from .models import User, Course, Enrollment, Payment, Assignment, Submission, Feedback, Attendance
+from .uploads import chunked_upload_settings
 
 
 class StudentRegistrationForm(UserCreationForm):
@@ -79,12 +83,13 @@ class EnrollmentForm(forms.ModelForm):
 class PaymentForm(forms.ModelForm):
     class Meta:
         model = Payment
-        fields = ['amount', 'payment_method', 'transaction_id', 'notes']
+        fields = ['amount', 'payment_method', 'transaction_id', 'notes', 'idempotency_key']
         widgets = {
             'amount': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'payment_method': forms.Select(attrs={'class': 'form-control'}),
             'transaction_id': forms.TextInput(attrs={'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+            'idempotency_key': forms.HiddenInput,
         }
 
 
@@ -111,6 +116,23 @@ class SubmissionForm(forms.ModelForm):
         }
 
 
+class ChunkedUploadForm(forms.Form):
+    """Starts (or resumes) a chunked upload of a file of ``size`` bytes."""
+    filename = forms.CharField(max_length=255)
+    size = forms.IntegerField(min_value=1)
+    sha256 = forms.RegexField(regex=r'^[0-9a-fA-F]{64}$', required=False)
+    
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        limit = chunked_upload_settings()['MAX_SIZE']
+        if size > limit:
+            raise forms.ValidationError(f'Files may be at most {limit} bytes.')
+        return size
+    
+    def clean_sha256(self):
+        return self.cleaned_data['sha256'].lower()
+
+
 class GradeSubmissionForm(forms.ModelForm):
     class Meta:
         model = Submission
@@ -163,4 +185,137 @@ class TrainerAllotmentForm(forms.ModelForm):
         fields = ['trainer']
         widgets = {
             'trainer': forms.Select(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+
+
+class RosterSelectForm(forms.Form):
+    course = forms.ModelChoiceField(queryset=Course.objects.none(), widget=forms.Select(attrs={'class': 'form-control'}))
+    date = forms.DateField(widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    
+    def __init__(self, *args, trainer=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['course'].queryset = Course.objects.filter(trainer=trainer)
+
+
+class RosterAttendanceForm(forms.Form):
+    """One status selector per enrollment on the roster, named status_<enrollment id>."""
+    
+    def __init__(self, *args, enrollments=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enrollments = list(enrollments)
+        for enrollment in self.enrollments:
+            self.fields[f'status_{enrollment.id}'] = forms.ChoiceField(
+                choices=Attendance.STATUS_CHOICES, initial='present',
+                widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+            )
+    
+    def rows(self):
+        for enrollment in self.enrollments:
+            yield enrollment, self[f'status_{enrollment.id}']
+    
+    def statuses(self):
+        return {enrollment.id: self.cleaned_data[f'status_{enrollment.id}'] for enrollment in self.enrollments}
+
+
+class BulkGradeForm(forms.Form):
+    """Marks and feedback inputs for every submission of one assignment."""
+    
+    def __init__(self, *args, submissions=(), max_marks=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submissions = list(submissions)
+        for submission in self.submissions:
+            self.fields[f'marks_{submission.id}'] = forms.IntegerField(
+                required=False, min_value=0, max_value=max_marks, initial=submission.marks_obtained,
+                widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm'}),
+            )
+            self.fields[f'feedback_{submission.id}'] = forms.CharField(
+                required=False, initial=submission.feedback,
+                widget=forms.Textarea(attrs={'class': 'form-control form-control-sm', 'rows': 1}),
+            )
+    
+    def rows(self):
+        for submission in self.submissions:
+            yield submission, self[f'marks_{submission.id}'], self[f'feedback_{submission.id}']
+    
+    def grades(self):
+        """{submission id: (marks, feedback)} for every row that has marks entered."""
+        grades = {}
+        for submission in self.submissions:
+            marks = self.cleaned_data[f'marks_{submission.id}']
+            if marks is not None:
+                grades[submission.id] = (marks, self.cleaned_data[f'feedback_{submission.id}'])
+        return grades
+
+
+class GradeUploadForm(forms.Form):
+    """CSV of grades with columns username, marks and an optional feedback column."""
+    grades_file = forms.FileField(widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv'}))
+    
+    def __init__(self, *args, submissions=(), max_marks=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.by_username = {submission.student.username: submission for submission in submissions}
+        self.max_marks = max_marks
+    
+    def clean_grades_file(self):
+        upload = self.cleaned_data['grades_file']
+        # Decoding happens lazily as rows are read, so read them all up front.
+        try:
+            reader = csv.DictReader(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+            fieldnames, rows = reader.fieldnames, list(reader)
+        except UnicodeDecodeError:
+            raise forms.ValidationError('The CSV must be saved as UTF-8.')
+        except csv.Error as e:
+            raise forms.ValidationError(f'The file could not be read as CSV: {e}.')
+        if not fieldnames or not {'username', 'marks'} <= set(fieldnames):
+            raise forms.ValidationError('The CSV needs a header row with at least "username" and "marks" columns.')
+        
+        grades, errors = {}, []
+        for line, row in enumerate(rows, start=2):
+            submission = self.by_username.get((row['username'] or '').strip())
+            if submission is None:
+                errors.append(f'Line {line}: no submission from "{row["username"]}".')
+                continue
+            try:
+                marks = int(row['marks'])
+            except (TypeError, ValueError):
+                errors.append(f'Line {line}: "{row["marks"]}" is not a whole number.')
+                continue
+            if not 0 <= marks <= self.max_marks:
+                errors.append(f'Line {line}: marks must be between 0 and {self.max_marks}.')
+                continue
+            grades[submission.id] = (marks, (row.get('feedback') or '').strip())
+        
+        if errors:
+            raise forms.ValidationError(errors)
+        self.grades = grades
+        return upload
+
+
+class ExportForm(forms.Form):
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    )
+    
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    course = forms.ModelChoiceField(queryset=Course.objects.all(), required=False)
+    status = forms.ChoiceField(required=False)
+    
+    def __init__(self, *args, export=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['status'].choices = [('', 'Any')] + [(value, value) for value in export.status_choices()]
+    
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'csv'
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError('The start date must be on or before the end date.')
+        return cleaned_data
+    
+    def filters(self):
+        return {field: self.cleaned_data[field] or None for field in ('start', 'end', 'course', 'status')}
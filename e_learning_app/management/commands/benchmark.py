@@ -0,0 +1,235 @@
+import datetime
+import json
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from e_learning_app import synthetic
+from e_learning_app.auth import invalidate_principal
+from e_learning_app.catalog import invalidate_catalog
+from e_learning_app.models import User, Enrollment, Payment, Assignment, Submission, Attendance
+from e_learning_app.urls import urlpatterns
+from e_learning_app.management.commands.loadtest import percentile
+
+# Timed signed out even though their names start with a role.
+ANONYMOUS = {'student_register', 'trainer_register'}
+# Views whose GET ends the session; timed with a throwaway client.
+SESSION_ENDING = {'logout'}
+# Extra query strings so list and search views do real work.
+QUERY_STRINGS = {
+    'search': 'q=python',
+    'manager_export': 'format=csv',
+}
+# Admin changelists timed as a superuser, with their date_hierarchy field. Each is
+# timed plain, on a later page, drilled into its latest month and as one change form.
+ADMIN_PAGES = {
+    Enrollment: 'enrollment_date',
+    Payment: 'payment_date',
+    Submission: 'submitted_at',
+    Attendance: 'date',
+}
+ADMIN_PAGE_NUMBER = 5
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database at a size tier, log in as each role and time a GET of every '
+            'named route in e_learning_app/urls.py, plus the admin changelists of the largest tables. Reports '
+            'p50/p95 latency, query count and response size; save runs with --json and diff them with --compare.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tier', choices=synthetic.TIERS, default='1k',
+                            help='Dataset size, in enrollments.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--runs', type=int, default=20, help='Timed requests per route.')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per route first.')
+        parser.add_argument('--routes', nargs='+', help='Only time these URL names.')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the test database and reuse it when it already holds the tier.')
+        parser.add_argument('--json', dest='json_path', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Earlier --json results to diff against.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Relative p95 slowdown reported as a regression by --compare.')
+
+    def handle(self, *args, **options):
+        baseline = self.load(options['compare']) if options['compare'] else None
+        enrollments = synthetic.TIERS[options['tier']]
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False,
+                                                    keepdb=options['keepdb'])
+        # Aliases that mirror the default one in tests (the read replica) must read the test data too.
+        for alias in connections:
+            if connections[alias].settings_dict['TEST'].get('MIRROR') == connection.alias:
+                connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+        try:
+            if Enrollment.objects.count() != enrollments:
+                self.stdout.write(f'Seeding {options["tier"]} tier...')
+                started = time.perf_counter()
+                counts = synthetic.generate(enrollments, seed=options['seed'])
+                self.stdout.write(f'Seeded {counts} in {time.perf_counter() - started:.1f}s')
+            results = {
+                'tier': options['tier'],
+                'enrollments': enrollments,
+                'seed': options['seed'],
+                'runs': options['runs'],
+                'vendor': connection.vendor,
+                'routes': self.run(options),
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+            # The catalog cache is shared with the real database; drop what the run cached.
+            invalidate_catalog()
+
+        self.report(results['routes'])
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2)
+        if baseline:
+            self.compare(baseline, results, options['threshold'])
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            raise CommandError(f'{path} does not exist.')
+
+    def samples(self):
+        """One object per URL parameter, owned by the users each role logs in as."""
+        enrollment = (Enrollment.objects.select_related('course')
+                      .filter(status='active', course__is_active=True, course__trainer__isnull=False)
+                      .order_by('id').first())
+        if enrollment is None:
+            raise CommandError('The seeded data has no active enrollment in an active, staffed course.')
+        assignment = Assignment.objects.filter(course=enrollment.course).order_by('id').first()
+        submission = Submission.objects.filter(assignment__course=enrollment.course).order_by('id').first()
+        payment = Payment.objects.order_by('id').first()
+        users = {
+            'student': enrollment.student,
+            'trainer': enrollment.course.trainer,
+            'manager': User.objects.filter(user_type='manager').order_by('id').first(),
+            'admin': (User.objects.filter(is_superuser=True).order_by('id').first()
+                      or User.objects.create_superuser('benchmark-admin', password=synthetic.PASSWORD)),
+        }
+        params = {
+            'course_id': enrollment.course_id,
+            'enrollment_id': enrollment.id,
+            'assignment_id': assignment and assignment.id,
+            'submission_id': submission and submission.id,
+            'payment_id': payment and payment.id,
+            'dataset': 'payments',
+        }
+        return users, params
+
+    def run(self, options):
+        users, params = self.samples()
+        clients = {None: Client()}
+        for role, user in users.items():
+            # The principal cache outlives test databases; drop whatever an earlier run cached for this id.
+            invalidate_principal(user.pk)
+            clients[role] = Client()
+            clients[role].force_login(user)
+
+        results = {}
+        for pattern in urlpatterns:
+            name = pattern.name
+            if not name or (options['routes'] and name not in options['routes']):
+                continue
+            prefix = name.split('_', 1)[0]
+            role = prefix if prefix in users and name not in ANONYMOUS else None
+            kwargs = {key: params.get(key) for key in pattern.pattern.converters}
+            if None in kwargs.values():
+                self.stderr.write(f'Skipping {name}: no sample object for {", ".join(kwargs)}')
+                continue
+            url = reverse(name, kwargs=kwargs)
+            if name in QUERY_STRINGS:
+                url = f'{url}?{QUERY_STRINGS[name]}'
+            client = Client() if name in SESSION_ENDING else clients[role]
+            results[name] = dict(role=role or 'anonymous', url=url, **self.time(client, url, options))
+
+        for name, url in self.admin_pages().items():
+            if not options['routes'] or name in options['routes']:
+                results[name] = dict(role='admin', url=url, **self.time(clients['admin'], url, options))
+        return results
+
+    def admin_pages(self):
+        pages = {}
+        for model, field in ADMIN_PAGES.items():
+            name = f'admin_{model._meta.model_name}'
+            latest = model.objects.order_by(f'-{field}', '-id').values_list('id', field).first()
+            if latest is None:
+                self.stderr.write(f'Skipping {name}: no rows')
+                continue
+            pk, when = latest
+            if isinstance(when, datetime.datetime):
+                when = timezone.localtime(when)
+            changelist = reverse(f'admin:e_learning_app_{model._meta.model_name}_changelist')
+            pages[name] = changelist
+            pages[f'{name}_page'] = f'{changelist}?p={ADMIN_PAGE_NUMBER}'
+            pages[f'{name}_month'] = f'{changelist}?{field}__year={when.year}&{field}__month={when.month}'
+            pages[f'{name}_change'] = reverse(f'admin:e_learning_app_{model._meta.model_name}_change', args=[pk])
+        return pages
+
+    def time(self, client, url, options):
+        for _ in range(options['warmup']):
+            self.fetch(client, url)
+
+        latencies, queries, size, status = [], [], 0, None
+        for _ in range(options['runs']):
+            # Counted on every alias, since replica_reads views query the replica.
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+                started = time.perf_counter()
+                status, size = self.fetch(client, url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(sum(len(capture) for capture in captured))
+        return {
+            'status': status,
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'queries': max(queries),
+            'bytes': size,
+        }
+
+    def fetch(self, client, url):
+        response = client.get(url)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, len(body)
+
+    def report(self, routes):
+        self.stdout.write(f'{"url name":32} {"role":9} {"status":>6} {"p50 ms":>8} {"p95 ms":>8} '
+                          f'{"queries":>7} {"bytes":>9}')
+        for name, route in routes.items():
+            self.stdout.write(f'{name:32} {route["role"]:9} {route["status"]:>6} {route["p50_ms"]:>8.1f} '
+                              f'{route["p95_ms"]:>8.1f} {route["queries"]:>7} {route["bytes"]:>9}')
+
+    def compare(self, baseline, results, threshold):
+        if (baseline['tier'], baseline['vendor']) != (results['tier'], results['vendor']):
+            self.stderr.write(f'Comparing across datasets: baseline is {baseline["tier"]}/{baseline["vendor"]}.')
+
+        regressions = []
+        self.stdout.write(f'\n{"url name":32} {"p95 ms":>17} {"change":>8} {"queries":>9}')
+        for name, route in results['routes'].items():
+            before = baseline['routes'].get(name)
+            if before is None:
+                self.stdout.write(f'{name:32} {"(new)":>17}')
+                continue
+            change = (route['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+            self.stdout.write(f'{name:32} {before["p95_ms"]:>8.1f}→{route["p95_ms"]:<8.1f} {change:>+8.0%} '
+                              f'{before["queries"]:>4}→{route["queries"]:<4}')
+            if change > threshold:
+                regressions.append(f'{name} p95 {change:+.0%}')
+            if route['queries'] > before['queries']:
+                regressions.append(f'{name} queries {before["queries"]}→{route["queries"]}')
+
+        if regressions:
+            raise CommandError(f'Regressions: {"; ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,85 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from e_learning_app.models import Course, Enrollment, Payment, Assignment, Submission, Feedback
+from e_learning_app.pagination import PAGE_SIZE
+
+# Placeholder ids: EXPLAIN only needs the query shape, not matching rows.
+USER_ID = COURSE_ID = ASSIGNMENT_ID = 1
+
+
+def _page(queryset, key):
+    """The first keyset page query paginate_keyset() runs for ``key``."""
+    prefix = '-' if key.startswith('-') else ''
+    return queryset.order_by(key, f'{prefix}id')[:PAGE_SIZE + 1]
+
+
+def view_queries():
+    """The main query behind each list view, keyed by URL name."""
+    active_courses = Enrollment.objects.filter(student=USER_ID, status='active').values_list('course', flat=True)
+    return {
+        'home': Course.objects.filter(is_active=True),
+        'student_dashboard': Enrollment.objects.for_student().filter(student=USER_ID),
+        'student_view_courses': Enrollment.objects.for_student().filter(student=USER_ID, status='active'),
+        'student_view_assignments': Assignment.objects.for_listing().filter(course__in=active_courses),
+        'trainer_dashboard': Course.objects.filter(trainer=USER_ID),
+        'trainer_view_students': _page(
+            Enrollment.objects.for_listing().filter(course__trainer=USER_ID, status='active'), '-enrollment_date'),
+        'trainer_roster_attendance': Enrollment.objects.for_listing().filter(course=COURSE_ID, status='active'),
+        'trainer_manage_assignments': Assignment.objects.with_submission_counts().filter(created_by=USER_ID),
+        'trainer_view_submissions': Submission.objects.for_gradebook().filter(assignment=ASSIGNMENT_ID),
+        'manager_view_feedbacks': _page(Feedback.objects.for_listing(), '-created_at'),
+        'manager_analyse_progress': _page(Enrollment.objects.for_listing().filter(status='active'), '-enrollment_date'),
+        'manager_view_payments': _page(Payment.objects.for_listing(), '-payment_date'),
+        'manager_view_payments?status=pending': _page(
+            Payment.objects.for_listing().filter(status='pending'), '-payment_date'),
+        'manager_view_payments?status=completed': _page(
+            Payment.objects.for_listing().filter(status='completed'), '-payment_date'),
+    }
+
+
+# A plan line that reads every row of a table rather than seeking an index.
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (\w+)(?: AS \w+)?$'),
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+}
+
+
+class Command(BaseCommand):
+    help = ("Run EXPLAIN on the main query of every list view and fail if any of them "
+            "falls back to a full table scan.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('views', nargs='*', help='Only check these URL names.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan for every query.')
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'No full-scan pattern for the {connection.vendor} backend.')
+
+        queries = view_queries()
+        unknown = set(options['views']) - set(queries)
+        if unknown:
+            raise CommandError(f'Unknown view(s): {", ".join(sorted(unknown))}')
+
+        failures = []
+        for name, queryset in queries.items():
+            if options['views'] and name not in options['views']:
+                continue
+            plan = queryset.explain()
+            scans = [match.group(1) for line in plan.splitlines() if (match := pattern.search(line.strip()))]
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name:32} full scan of {", ".join(scans)}'))
+            else:
+                self.stdout.write(f'{name:32} ok')
+            if options['verbose_plans'] or scans:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'Full table scans in: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Every view query uses an index.'))
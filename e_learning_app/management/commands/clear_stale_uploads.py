@@ -0,0 +1,43 @@
+import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from e_learning_app.models import ChunkedUpload
+from e_learning_app.uploads import chunked_upload_settings, discard
+
+
+class Command(BaseCommand):
+    help = ('Delete chunked uploads (and their part files) that have not received a chunk within '
+            "CHUNKED_UPLOADS['EXPIRE_HOURS'], plus part files with no upload row.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, help="Override CHUNKED_UPLOADS['EXPIRE_HOURS'].")
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted, delete nothing.')
+
+    def handle(self, *args, **options):
+        config = chunked_upload_settings()
+        hours = options['hours'] if options['hours'] is not None else config['EXPIRE_HOURS']
+        cutoff = timezone.now() - datetime.timedelta(hours=hours)
+
+        stale = ChunkedUpload.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for upload in stale.iterator():
+            self.stdout.write(f'stale {upload.id} {upload.filename} ({upload.offset}/{upload.size} bytes)')
+            if not options['dry_run']:
+                if ChunkedUpload.objects.filter(pk=upload.pk, updated_at__lt=cutoff).delete()[0]:
+                    discard(upload)
+            count += 1
+
+        known = {str(pk) for pk in ChunkedUpload.objects.values_list('id', flat=True)}
+        directory = Path(config['DIR'])
+        for path in directory.glob('*.part') if directory.is_dir() else ():
+            if path.stem not in known and path.stat().st_mtime < cutoff.timestamp():
+                self.stdout.write(f'orphaned {path.name}')
+                if not options['dry_run']:
+                    path.unlink(missing_ok=True)
+                count += 1
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {count} stale upload(s).'))
@@ -0,0 +1,131 @@
+import io
+import os
+import tempfile
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from e_learning_app.catalog import invalidate_catalog
+from e_learning_app.models import User, Course, Enrollment, Payment
+
+
+class Command(BaseCommand):
+    help = ('Fire parallel enroll and pay requests at one course on a throwaway test database and check that '
+            'every student ends up with exactly one enrollment, one completed payment and consistent counters. '
+            'Exits non-zero if any request errors or any invariant breaks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10)
+        parser.add_argument('--parallel', type=int, default=8,
+                            help='Simultaneous requests per student in each round (double-clicks, retries, tabs).')
+
+    def handle(self, *args, **options):
+        students, parallel = options['students'], options['parallel']
+        # Threads need their own connections to one database, which SQLite's
+        # default in-memory test database cannot give them.
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        old_test_name = test_settings.get('NAME')
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(tempfile.mkdtemp(), 'enrollment_race.sqlite3')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            course, users = self.seed(students)
+            enroll = self.burst(users, parallel, lambda client, user, i: client.get(
+                reverse('student_enroll_course', args=[course.pk])))
+            enrollment_ids = dict(Enrollment.objects.filter(course=course).values_list('student_id', 'id'))
+            pay = self.burst(users, parallel, lambda client, user, i: client.post(
+                reverse('student_make_payment', args=[enrollment_ids[user.pk]]),
+                self.payment_data(course, user, i),
+            ))
+            problems = self.verify(course, users, {'enroll': enroll, 'pay': pay})
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            test_settings['NAME'] = old_test_name
+            invalidate_catalog()
+
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('No duplicates, lost payments or counter drift.'))
+
+    def seed(self, students):
+        trainer = User.objects.create_user('race-trainer', password='x', user_type='trainer')
+        course = Course.objects.create(name='Race course', description='', duration_weeks=4,
+                                       difficulty_level='beginner', fee=500, trainer=trainer)
+        users = [User.objects.create_user(f'race-student-{i}', password='x', user_type='student')
+                 for i in range(students)]
+        return course, users
+
+    def payment_data(self, course, user, i):
+        # Even attempts are retries of one submission (same key); odd ones
+        # are separate submissions from other tabs (fresh keys).
+        key = f'retry-{user.pk}' if i % 2 == 0 else uuid.uuid4().hex
+        return {
+            'amount': course.fee, 'payment_method': 'upi', 'transaction_id': uuid.uuid4().hex,
+            'notes': '', 'idempotency_key': key,
+        }
+
+    def burst(self, users, parallel, send):
+        """Log each user into ``parallel`` clients, then release all their requests at once."""
+        jobs = []
+        for user in users:
+            for i in range(parallel):
+                client = Client()
+                client.force_login(user)
+                jobs.append((client, user, i))
+        connections.close_all()
+        barrier = threading.Barrier(len(jobs))
+
+        def run(job):
+            client, user, i = job
+            barrier.wait()
+            try:
+                return str(send(client, user, i).status_code)
+            except Exception as exc:
+                return type(exc).__name__
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            outcomes = Counter(pool.map(run, jobs))
+        return outcomes
+
+    def verify(self, course, users, rounds):
+        problems = []
+        for name, outcomes in rounds.items():
+            self.stdout.write(f'{name:8} ' + ', '.join(f'{outcome}: {n}' for outcome, n in sorted(outcomes.items())))
+            errors = {outcome: n for outcome, n in outcomes.items() if outcome != '302'}
+            if errors:
+                problems.append(f'{name}: unexpected responses {errors}')
+
+        per_student = Enrollment.objects.filter(course=course).values('student_id').annotate(
+            n=Count('id', distinct=True), paid=Count('payments', filter=Q(payments__status='completed')))
+        for row in per_student:
+            if row['n'] != 1 or row['paid'] != 1:
+                problems.append(f'student {row["student_id"]}: {row["n"]} enrollment(s), {row["paid"]} payment(s)')
+        if len(per_student) != len(users):
+            problems.append(f'{len(per_student)} of {len(users)} students enrolled')
+        payments = Payment.objects.filter(enrollment__course=course).count()
+        if payments != len(users):
+            problems.append(f'{payments} payment rows stored for {len(users)} students')
+        active = Enrollment.objects.filter(course=course, status='active').count()
+        if active != len(users):
+            problems.append(f'{active} of {len(users)} enrollments active')
+
+        try:
+            call_command('recount', check=True, stdout=io.StringIO())
+        except CommandError as exc:
+            problems.append(str(exc))
+        return problems
@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from e_learning_app.exports import EXPORTS, stream_rows
+from e_learning_app.forms import ExportForm
+
+
+class Command(BaseCommand):
+    help = 'Stream payments, enrollments, attendance or submissions to CSV/NDJSON with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS))
+        parser.add_argument('--format', default='csv', choices=['csv', 'ndjson'])
+        parser.add_argument('--start', help='First day to include (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last day to include (YYYY-MM-DD).')
+        parser.add_argument('--course', help='Course id.')
+        parser.add_argument('--status')
+        parser.add_argument('--output', '-o', help='File to write (defaults to stdout).')
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options['dataset']]
+        data = {field: options[field] or '' for field in ('format', 'start', 'end', 'course', 'status')}
+        form = ExportForm(data, export=export)
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        rows = export.queryset(**form.filters())
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in stream_rows(export, rows, form.cleaned_data['format']):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
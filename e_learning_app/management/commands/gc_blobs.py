@@ -0,0 +1,123 @@
+import datetime
+import os
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from e_learning_app.models import Blob
+from e_learning_app.storage import BLOB_NAME, blob_storages, is_blob_name
+
+# Partial writes and interrupted sweeps left next to the blobs.
+SCRATCH_PREFIXES = ('.upload-', '.gc-')
+
+
+class Command(BaseCommand):
+    help = ('Delete content-addressed blobs that no file field references any more, plus stray files '
+            'with no Blob row. --recount first rebuilds the reference counts from the database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help='Recount references from every content-addressed file field before sweeping.')
+        parser.add_argument('--min-age', type=int, default=60,
+                            help='Only collect blobs and files untouched for this many minutes, so uploads '
+                                 'still in flight are left alone.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted, delete nothing.')
+
+    def handle(self, *args, **options):
+        fields = blob_storages()
+        if not fields:
+            raise CommandError('No file field uses ContentAddressedStorage.')
+        cutoff = timezone.now() - datetime.timedelta(minutes=options['min_age'])
+
+        if options['recount']:
+            self.recount(fields, options['dry_run'])
+
+        storages = {storage.location: storage for _, _, storage in fields}
+        freed = count = 0
+        for blob in Blob.objects.filter(refs=0, updated_at__lt=cutoff).iterator():
+            storage = next((s for s in storages.values() if s.exists(blob.name)), None)
+            if options['dry_run'] or self.collect(blob, storage):
+                count += 1
+                freed += blob.size
+                self.stdout.write(f'unreferenced {blob.name} ({blob.size} bytes)')
+
+        for storage in storages.values():
+            for name, path in self.stray_files(storage, fields, cutoff.timestamp()):
+                size = os.path.getsize(path)
+                if not options['dry_run']:
+                    os.remove(path)
+                count += 1
+                freed += size
+                self.stdout.write(f'stray {name} ({size} bytes)')
+
+        verb = 'Would free' if options['dry_run'] else 'Freed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {freed} bytes in {count} file(s).'))
+
+    def recount(self, fields, dry_run):
+        """Set every Blob's refs to the number of rows that actually point at it."""
+        live = Counter()
+        for model, field, _ in fields:
+            names = model._default_manager.exclude(**{field.name: ''}).values_list(field.name, flat=True)
+            live.update(name for name in names.iterator() if is_blob_name(name))
+
+        stored = dict(Blob.objects.values_list('name', 'refs'))
+        drift = {name: refs for name, refs in live.items() if stored.get(name) != refs}
+        drift.update({name: 0 for name, refs in stored.items() if refs and name not in live})
+        for name, refs in sorted(drift.items()):
+            self.stdout.write(f'refs {name}: stored={stored.get(name)} exact={refs}')
+        if dry_run:
+            return
+
+        now = timezone.now()
+        missing = []
+        for name, refs in drift.items():
+            if name in stored:
+                Blob.objects.filter(name=name).update(refs=refs, updated_at=now)
+                continue
+            storage = next((s for _, _, s in fields if s.exists(name)), None)
+            if storage is None:
+                missing.append(name)
+                continue
+            Blob.objects.create(name=name, size=storage.size(name), refs=refs, updated_at=now)
+        for name in missing:
+            self.stderr.write(f'Referenced blob is missing from storage: {name}')
+        self.stdout.write(f'Recounted references: {len(drift)} blob(s) corrected.')
+
+    def collect(self, blob, storage):
+        """
+        Delete one unreferenced blob. The file is moved aside before the row
+        is deleted (only while it still has no references), so a concurrent
+        upload of the same content either revives the row, and the file is
+        moved back, or finds the file missing and writes it again.
+        """
+        if storage is None:
+            return Blob.objects.filter(name=blob.name, refs=0).delete()[0] > 0
+        path = storage.path(blob.name)
+        directory, filename = os.path.split(path)
+        tombstone = os.path.join(directory, f'.gc-{filename}')
+        os.replace(path, tombstone)
+        if Blob.objects.filter(name=blob.name, refs=0).delete()[0]:
+            os.remove(tombstone)
+            return True
+        if not os.path.exists(path):
+            os.replace(tombstone, path)
+        else:
+            os.remove(tombstone)
+        return False
+
+    def stray_files(self, storage, fields, cutoff):
+        """Blob-shaped files with no Blob row, and scratch files, older than ``cutoff``."""
+        known = set(Blob.objects.values_list('name', flat=True))
+        roots = {field.upload_to for _, field, s in fields if s is storage and isinstance(field.upload_to, str)}
+        for root in roots:
+            top = storage.path(root)
+            for directory, _, filenames in os.walk(top):
+                for filename in filenames:
+                    path = os.path.join(directory, filename)
+                    name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                    scratch = filename.startswith(SCRATCH_PREFIXES)
+                    if not scratch and (not BLOB_NAME.search(name) or name in known):
+                        continue
+                    if os.path.getmtime(path) < cutoff:
+                        yield name, path
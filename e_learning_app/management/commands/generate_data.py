@@ -0,0 +1,39 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from e_learning_app import synthetic
+
+
+class Command(BaseCommand):
+    help = ('Generate a reproducible synthetic dataset (users, courses, enrollments, payments, assignments, '
+            'submissions, feedback and attendance) for load testing. Rows are added after any existing ones.')
+
+    def add_arguments(self, parser):
+        size = parser.add_mutually_exclusive_group()
+        size.add_argument('--enrollments', type=int, help='Number of enrollments; every other table scales from it.')
+        size.add_argument('--tier', choices=synthetic.TIERS, help='Preset size, in enrollments.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--as-of', type=datetime.date.fromisoformat,
+                            help='Date (YYYY-MM-DD) the data ends at; defaults to today. Same seed, size and '
+                                 'date give the same data.')
+        parser.add_argument('--batch-size', type=int, default=synthetic.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        enrollments = options['enrollments']
+        if enrollments is None:
+            enrollments = synthetic.TIERS[options['tier'] or '1k']
+        if enrollments < 1:
+            raise CommandError('--enrollments must be positive.')
+
+        started = time.perf_counter()
+        counts = synthetic.generate(enrollments, seed=options['seed'], batch_size=options['batch_size'],
+                                    as_of=options['as_of'])
+        elapsed = time.perf_counter() - started
+
+        for table, rows in counts.items():
+            self.stdout.write(f'{table:12} {rows:>10}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {sum(counts.values())} rows in {elapsed:.1f}s (seed {options["seed"]}).'
+        ))
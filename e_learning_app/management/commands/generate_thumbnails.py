@@ -0,0 +1,56 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from e_learning_app.models import User
+from e_learning_app.thumbnails import generate, variant_names
+
+
+def _generate(name, force):
+    try:
+        return name, len(generate(name, force=force)), None
+    except Exception as exc:
+        return name, 0, f'{type(exc).__name__}: {exc}'
+
+
+class Command(BaseCommand):
+    help = ('Create the missing thumbnail variants of every profile picture in parallel worker processes; '
+            '--force rebuilds them all (for instance after changing THUMBNAILS).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes.')
+        parser.add_argument('--force', action='store_true', help='Rebuild variants that already exist.')
+
+    def handle(self, *args, **options):
+        names = (User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+                 .values_list('profile_picture', flat=True).order_by('pk'))
+        if not options['force']:
+            names = [name for name in names.iterator()
+                     if not all(default_storage.exists(variant) for variant in variant_names(name))]
+        names = list(names)
+        if not names:
+            self.stdout.write(self.style.SUCCESS('Every profile picture already has its thumbnails.'))
+            return
+
+        started = time.perf_counter()
+        written = failed = 0
+        # Each worker sets Django up itself, so this also works where processes are spawned rather than forked.
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            results = pool.map(_generate, names, [options['force']] * len(names), chunksize=16)
+            for name, count, error in results:
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                written += count
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} variant(s) for {len(names) - failed} picture(s) in {elapsed:.1f}s '
+            f'with {options["workers"]} worker(s); {failed} failed.'
+        ))
+        if failed:
+            self.stderr.write('Failed pictures are retried on the next run.')
@@ -0,0 +1,86 @@
+import http.cookiejar
+import json
+import statistics
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Fire concurrent GETs at a running server (e.g. gunicorn WSGI vs uvicorn ASGI) '
+            'and report latency percentiles and throughput per path.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='Server root, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--paths', nargs='+', default=['/manager/dashboard/'])
+        parser.add_argument('--username')
+        parser.add_argument('--password')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path.')
+        parser.add_argument('--label', default='', help='Name for this run (e.g. wsgi / asgi).')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        cookie = self.login(base_url, options['username'], options['password']) if options['username'] else ''
+
+        results = {'label': options['label'], 'concurrency': options['concurrency'], 'paths': {}}
+        for path in options['paths']:
+            results['paths'][path] = self.hammer(base_url + path, cookie, options['concurrency'], options['requests'])
+
+        self.stdout.write(f'{"path":40} {"ok":>6} {"err":>5} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8}')
+        for path, stats in results['paths'].items():
+            self.stdout.write(f'{path:40} {stats["ok"]:>6} {stats["errors"]:>5} {stats["p50_ms"]:>8.1f} '
+                              f'{stats["p95_ms"]:>8.1f} {stats["p99_ms"]:>8.1f} {stats["throughput"]:>8.1f}')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2)
+
+    def login(self, base_url, username, password):
+        jar = http.cookiejar.CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+        opener.open(f'{base_url}/login/').read()
+        csrf = next((c.value for c in jar if c.name == 'csrftoken'), '')
+        data = urllib.parse.urlencode({'username': username, 'password': password, 'csrfmiddlewaretoken': csrf})
+        opener.open(urllib.request.Request(f'{base_url}/login/', data=data.encode(),
+                                           headers={'Referer': f'{base_url}/login/'})).read()
+        if not any(c.name == 'sessionid' for c in jar):
+            raise CommandError(f'Could not log in as {username}.')
+        return '; '.join(f'{c.name}={c.value}' for c in jar)
+
+    def hammer(self, url, cookie, concurrency, total):
+        def fetch(_):
+            request = urllib.request.Request(url, headers={'Cookie': cookie})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    ok = response.status == 200
+            except OSError:
+                ok = False
+            return ok, (time.perf_counter() - start) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [ms for ok, ms in outcomes if ok] or [0.0]
+        return {
+            'ok': sum(ok for ok, _ in outcomes),
+            'errors': sum(not ok for ok, _ in outcomes),
+            'p50_ms': statistics.median(latencies),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'throughput': total / elapsed,
+        }
@@ -0,0 +1,58 @@
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from e_learning_app.middleware import query_budget_settings
+
+
+class Command(BaseCommand):
+    help = 'Summarise the query budget log written by QueryBudgetMiddleware, per URL name.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='Log file to read (defaults to QUERY_BUDGET["LOG_FILE"]).')
+        parser.add_argument('--check', action='store_true',
+                            help='Exit with an error if any view went over budget or has N+1 suspects.')
+        parser.add_argument('--clear', action='store_true', help='Truncate the log after reporting.')
+
+    def handle(self, *args, **options):
+        log_file = options['log'] or query_budget_settings()['LOG_FILE']
+        if not log_file:
+            raise CommandError('No log file given and QUERY_BUDGET["LOG_FILE"] is not set.')
+
+        views = defaultdict(lambda: {'requests': 0, 'queries': [], 'db_time_ms': 0.0, 'budget': 0, 'suspects': {}})
+        try:
+            with open(log_file, encoding='utf-8') as fh:
+                for line in fh:
+                    entry = json.loads(line)
+                    view = views[entry['url_name']]
+                    view['requests'] += 1
+                    view['queries'].append(entry['queries'])
+                    view['db_time_ms'] += entry['db_time_ms']
+                    view['budget'] = entry['budget']
+                    for suspect in entry['suspects']:
+                        view['suspects'][suspect['sql']] = max(view['suspects'].get(suspect['sql'], 0), suspect['count'])
+        except FileNotFoundError:
+            raise CommandError(f'{log_file} does not exist; enable QueryBudgetMiddleware logging first.')
+
+        failures = []
+        self.stdout.write(f'{"url name":40} {"reqs":>6} {"avg q":>7} {"max q":>7} {"budget":>7} {"avg ms":>9}')
+        for url_name, view in sorted(views.items(), key=lambda item: -max(item[1]['queries'])):
+            max_queries = max(view['queries'])
+            avg_queries = sum(view['queries']) / view['requests']
+            avg_ms = view['db_time_ms'] / view['requests']
+            line = f'{url_name:40} {view["requests"]:>6} {avg_queries:>7.1f} {max_queries:>7} {view["budget"]:>7} {avg_ms:>9.2f}'
+            if max_queries > view['budget']:
+                failures.append(url_name)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+            for sql, hits in sorted(view['suspects'].items(), key=lambda item: -item[1]):
+                if url_name not in failures:
+                    failures.append(url_name)
+                self.stdout.write(self.style.WARNING(f'    N+1 suspect ({hits}x): {sql[:150]}'))
+
+        if options['clear']:
+            open(log_file, 'w').close()
+
+        if options['check'] and failures:
+            raise CommandError(f'Query budget check failed for: {", ".join(failures)}')
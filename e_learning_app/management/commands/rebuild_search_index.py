@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from e_learning_app import search
+
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text search triggers and reload the FTS5 index from the source tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Full-text search uses SQLite FTS5; nothing to rebuild on this backend.')
+        with transaction.atomic(using=options['database']), connection.cursor() as cursor:
+            search.rebuild(cursor)
+            cursor.execute(f'SELECT count(*) FROM {search.SEARCH_TABLE}')
+            count = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt with {count} documents.'))
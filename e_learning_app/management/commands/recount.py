@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from e_learning_app.models import Course, PlatformStats, COURSE_STAT_FIELDS
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the denormalized counters (PlatformStats and the per-course stat columns) '
+            'from the source tables, or report drift with --check.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare stored counters with exact counts; exit non-zero on drift.')
+
+    def handle(self, *args, **options):
+        drift = self.check_platform_stats() + self.check_course_stats()
+
+        if options['check']:
+            if drift:
+                raise CommandError(f'Counter drift detected in: {", ".join(drift)}')
+            self.stdout.write(self.style.SUCCESS('Counters are consistent.'))
+            return
+
+        PlatformStats.rebuild()
+        updated = Course.objects.rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt platform counters and stats for {updated} course(s) ({len(drift)} drifted value(s) corrected).'
+        ))
+
+    def check_platform_stats(self):
+        exact = PlatformStats.compute()
+        stored = PlatformStats.objects.filter(pk=1).values(*exact).first()
+
+        drift = []
+        for field, value in exact.items():
+            current = stored[field] if stored else None
+            if current != value:
+                drift.append(field)
+            self.stdout.write(f'{field:20} stored={current!s:>10} exact={value:>10}')
+        return drift
+
+    def check_course_stats(self):
+        drift = []
+        courses = Course.objects.with_exact_stats().values('id', 'name', *COURSE_STAT_FIELDS,
+                                                           *[f'exact_{field}' for field in COURSE_STAT_FIELDS])
+        for course in courses.iterator():
+            for field in COURSE_STAT_FIELDS:
+                if course[field] != course[f'exact_{field}']:
+                    drift.append(f'course {course["id"]}.{field}')
+                    self.stdout.write(f'course {course["id"]} ({course["name"]}) {field}: '
+                                      f'stored={course[field]} exact={course[f"exact_{field}"]}')
+        return drift
@@ -0,0 +1,94 @@
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from e_learning_app import tasks
+
+# Seconds between sweeps for stale claims and old finished tasks.
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = ('Run queued background tasks. Claims due tasks in batches and executes them on a thread or '
+            'process pool; failed tasks are retried with exponential backoff. Stop with SIGINT/SIGTERM, '
+            'which finishes the tasks in hand first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Tasks run at the same time.')
+        parser.add_argument('--executor', choices=('thread', 'process'), default='thread',
+                            help='thread suits I/O-bound tasks; process suits CPU-bound ones.')
+        parser.add_argument('--batch-size', type=int,
+                            help='Tasks claimed per query; defaults to --concurrency.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once no task is due instead of polling.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        concurrency = options['concurrency']
+        batch_size = options['batch_size'] or concurrency
+        if options['executor'] == 'process':
+            # Children open their own connections; never share the parent's across fork().
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concurrency, initializer=django.setup)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task')
+
+        counts = {'done': 0, 'retried': 0, 'failed': 0}
+        in_flight = {}
+        last_maintenance = 0.0
+        with pool:
+            while not self.stopping:
+                if time.monotonic() - last_maintenance > MAINTENANCE_INTERVAL:
+                    tasks.requeue_stale()
+                    tasks.purge_done()
+                    last_maintenance = time.monotonic()
+
+                free = concurrency - len(in_flight)
+                claimed = tasks.claim(min(batch_size, free)) if free else []
+                for row in claimed:
+                    in_flight[pool.submit(tasks.execute, row.name, row.args, row.kwargs)] = row
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                # Poll again as soon as a slot frees up, or after the interval if the queue looked empty.
+                timeout = None if claimed and len(in_flight) >= concurrency else options['poll_interval']
+                finished, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.record(in_flight.pop(future), future, counts)
+
+            for future in wait(in_flight).done:
+                self.record(in_flight.pop(future), future, counts)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Stopped: {counts["done"]} done, {counts["retried"]} to retry, {counts["failed"]} failed.'
+        ))
+
+    def record(self, row, future, counts):
+        try:
+            error = future.result()
+        except Exception as exc:  # The pool itself broke, e.g. a worker process died.
+            error = f'{type(exc).__name__}: {exc}'
+        tasks.finish(row, error)
+        if error is None:
+            counts['done'] += 1
+        elif row.attempts >= row.max_attempts:
+            counts['failed'] += 1
+        else:
+            counts['retried'] += 1
+        if self.verbosity > 1 or error:
+            self.stdout.write(f'task {row.pk} {row.name}: {"ok" if error is None else "error"}')
+
+    def stop(self, signum, frame):
+        self.stopping = True
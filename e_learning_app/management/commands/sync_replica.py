@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from e_learning_app.replica import replica_settings
+
+# Pages copied per backup step; writers can commit between steps.
+BACKUP_PAGES = 4096
+
+
+class Command(BaseCommand):
+    help = ('Refresh the local SQLite read replica (REPLICA["SNAPSHOT_PATH"]) with a consistent snapshot '
+            'of the primary database. The snapshot is written beside the replica and swapped in with '
+            'one rename, so readers never see a partial copy. Use --interval to keep it in sync.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep running and take a snapshot every this many seconds.')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        target = replica_settings()['SNAPSHOT_PATH']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replica copies SQLite files; use the database\'s own replication instead.')
+        if not target:
+            raise CommandError('Set REPLICA["SNAPSHOT_PATH"] to the replica file.')
+
+        while True:
+            started = time.perf_counter()
+            size = self.snapshot(str(primary['NAME']), str(target))
+            self.stdout.write(f'Replica {target} refreshed ({size / 1024 / 1024:.1f} MiB) '
+                              f'in {time.perf_counter() - started:.2f}s.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def snapshot(self, source, target):
+        directory = os.path.dirname(os.path.abspath(target))
+        fd, scratch = tempfile.mkstemp(dir=directory, prefix='.replica-', suffix='.sqlite3')
+        os.close(fd)
+        try:
+            # The backup API copies a consistent snapshot, including commits still in the WAL.
+            with sqlite3.connect(source) as src, sqlite3.connect(scratch) as dst:
+                src.backup(dst, pages=BACKUP_PAGES)
+                # A rollback journal lets read-only connections open the file without creating -wal/-shm.
+                dst.execute('PRAGMA journal_mode=DELETE')
+            src.close()
+            dst.close()
+            os.replace(scratch, target)
+        except BaseException:
+            os.unlink(scratch)
+            raise
+        return os.path.getsize(target)
@@ -0,0 +1,145 @@
+import datetime
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+
+from e_learning_app.management.commands.loadtest import percentile
+from e_learning_app.models import User, Course, Enrollment, Assignment, Submission, Attendance
+
+ALIAS = 'write_contention'
+STUDENTS = 40
+
+
+def _register(path, options):
+    connections.settings[ALIAS] = {**connections['default'].settings_dict, 'NAME': path, 'OPTIONS': options}
+
+
+def _worker(path, options, start_at, seconds, seed):
+    """
+    Alternate the two writes that collide at a class changeover until the
+    deadline: saving a roster's attendance (an upsert after reading the
+    roster) and grading one submission (a read, then an update), each in a
+    transaction as the views run them.
+    """
+    _register(path, options)
+    rng = random.Random(seed)
+    course = Course.objects.using(ALIAS).get()
+    submission_ids = list(Submission.objects.using(ALIAS).values_list('id', flat=True))
+    today = datetime.date.today()
+    latencies, locked = [], 0
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(using=ALIAS):
+                if rng.random() < 0.5:
+                    roster = Enrollment.objects.using(ALIAS).filter(course=course, status='active')
+                    date = today - datetime.timedelta(days=rng.randrange(30))
+                    Attendance.objects.using(ALIAS).bulk_create(
+                        [Attendance(enrollment_id=pk, date=date, status=rng.choice(('present', 'absent', 'late')))
+                         for pk in roster.values_list('id', flat=True)],
+                        update_conflicts=True, unique_fields=['enrollment', 'date'], update_fields=['status'],
+                    )
+                else:
+                    submission = Submission.objects.using(ALIAS).filter(pk=rng.choice(submission_ids))
+                    marks = submission.values_list('marks_obtained', flat=True).get()
+                    submission.update(marks_obtained=((marks or 0) + 1) % 100)
+        except OperationalError as exc:
+            if 'locked' not in str(exc) and 'busy' not in str(exc):
+                raise
+            locked += 1
+        else:
+            latencies.append((time.perf_counter() - started) * 1000)
+    connections[ALIAS].close()
+    return latencies, locked
+
+
+class Command(BaseCommand):
+    help = ('Measure SQLite write contention: worker processes write attendance and grades to a scratch '
+            'database at the same time, first with Django\'s stock SQLite options, then with the OPTIONS in '
+            'settings.DATABASES["default"]. Reports throughput and the rate of "database is locked" errors.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Concurrent writer processes.')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Length of each run.')
+        parser.add_argument('--profiles', nargs='+', choices=('stock', 'tuned'), default=['stock', 'tuned'])
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('write_contention measures SQLite; the default database is not SQLite.')
+        profiles = {'stock': {}, 'tuned': connections['default'].settings_dict.get('OPTIONS', {})}
+
+        results = {'processes': options['processes'], 'seconds': options['seconds'], 'profiles': {}}
+        for name in options['profiles']:
+            results['profiles'][name] = self.run(profiles[name], options['processes'], options['seconds'])
+
+        self.stdout.write(f'{"profile":8} {"ok":>7} {"locked":>7} {"error %":>8} {"tx/s":>8} '
+                          f'{"p50 ms":>8} {"p95 ms":>8}')
+        for name, stats in results['profiles'].items():
+            self.stdout.write(f'{name:8} {stats["ok"]:>7} {stats["locked"]:>7} {stats["error_rate"] * 100:>8.1f} '
+                              f'{stats["throughput"]:>8.1f} {stats["p50_ms"]:>8.1f} {stats["p95_ms"]:>8.1f}')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(results, fh, indent=2)
+
+    def run(self, sqlite_options, processes, seconds):
+        # A fresh file per profile: WAL mode, once set, sticks to the database file.
+        directory = tempfile.mkdtemp(prefix='write-contention-')
+        path = os.path.join(directory, 'contention.sqlite3')
+        try:
+            _register(path, sqlite_options)
+            call_command('migrate', database=ALIAS, verbosity=0, interactive=False)
+            self.seed()
+            connections[ALIAS].close()
+
+            # Workers set Django up themselves and all start at the same moment.
+            start_at = time.time() + 2
+            with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as pool:
+                futures = [pool.submit(_worker, path, sqlite_options, start_at, seconds, seed)
+                           for seed in range(processes)]
+                outcomes = [future.result() for future in futures]
+        finally:
+            connections[ALIAS].close()
+            del connections[ALIAS], connections.settings[ALIAS]
+            shutil.rmtree(directory, ignore_errors=True)
+
+        latencies = [ms for worker_latencies, _ in outcomes for ms in worker_latencies] or [0.0]
+        ok = sum(len(worker_latencies) for worker_latencies, _ in outcomes)
+        locked = sum(worker_locked for _, worker_locked in outcomes)
+        return {
+            'options': {key: str(value) for key, value in sqlite_options.items()},
+            'ok': ok,
+            'locked': locked,
+            'error_rate': round(locked / ((ok + locked) or 1), 4),
+            'throughput': round(ok / seconds, 1),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+        }
+
+    def seed(self):
+        trainer = User.objects.db_manager(ALIAS).create_user('contention-trainer', user_type='trainer')
+        course = Course.objects.using(ALIAS).create(name='Contention', description='', duration_weeks=4,
+                                                    difficulty_level='beginner', fee=0, trainer=trainer)
+        assignment = Assignment.objects.using(ALIAS).create(
+            course=course, title='Contention', description='', max_marks=100, created_by=trainer,
+            due_date=datetime.datetime.now(datetime.timezone.utc))
+        students = User.objects.using(ALIAS).bulk_create(
+            [User(username=f'contention-{i}', user_type='student') for i in range(STUDENTS)])
+        Enrollment.objects.using(ALIAS).bulk_create(
+            [Enrollment(student=student, course=course, status='active') for student in students])
+        Submission.objects.using(ALIAS).bulk_create(
+            [Submission(assignment=assignment, student=student, submission_file='contention.txt')
+             for student in students])
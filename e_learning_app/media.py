@@ -0,0 +1,182 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from .storage import BLOB_NAME
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def protected_media_settings():
+    config = {
+        # None serves the file from Django; 'x-accel-redirect' (nginx) or
+        # 'x-sendfile' (Apache mod_xsendfile, lighttpd) hand it to the front server.
+        'SERVER': None,
+        # nginx `internal` location that aliases MEDIA_ROOT.
+        'ACCEL_PREFIX': '/protected-media/',
+        'MAX_AGE': 60 * 60,
+    }
+    config.update(getattr(settings, 'PROTECTED_MEDIA', {}))
+    return config
+
+
+class RangeFile:
+    """
+    Read-only view of bytes ``start``-``end`` of an open file. fileno() is
+    passed through, so a WSGI server's sendfile() path (gunicorn's, for
+    one) still applies: it starts at the current offset and sends
+    Content-Length bytes.
+    """
+
+    def __init__(self, file, start, end):
+        self.file = file
+        self.name = file.name
+        self.remaining = end - start
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class MediaFileResponse(FileResponse):
+    """
+    FileResponse in 64 KiB blocks. Pass ``asynchronous=True`` for requests
+    served over ASGI: Django's ASGI handler reads a sync iterator to the end
+    before sending anything, so the blocks are read through an async one.
+    """
+    block_size = 64 * 1024
+
+    def __init__(self, *args, asynchronous=False, **kwargs):
+        self.asynchronous = asynchronous
+        super().__init__(*args, **kwargs)
+
+    def _set_streaming_content(self, value):
+        super()._set_streaming_content(value)
+        if self.asynchronous and self.file_to_stream is not None:
+            # FileResponse has already set the headers and registered the
+            # file's close(); only the iterator is swapped.
+            StreamingHttpResponse._set_streaming_content(self, self._ablocks(self.file_to_stream))
+
+    async def _ablocks(self, filelike):
+        read = sync_to_async(filelike.read, thread_sensitive=False)
+        while block := await read(self.block_size):
+            yield block
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single ``Range: bytes=`` header (end exclusive), None
+    when the whole file should be sent, or ValueError when unsatisfiable.
+    Multiple ranges are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    elif last:
+        start, end = max(size - int(last), 0), size
+    else:
+        return None
+    if start >= end:
+        raise ValueError(header)
+    return start, end
+
+
+def _etag(name, stat):
+    # Content-addressed names already carry the SHA-256 of the file.
+    if BLOB_NAME.search(name):
+        return quote_etag(os.path.splitext(os.path.basename(name))[0])
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def _range_applies(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_media(request, field_file, filename=None, as_attachment=False):
+    """
+    Respond with ``field_file`` once the caller has checked access. ETag
+    and Last-Modified are answered here, so If-None-Match and
+    If-Modified-Since requests never open the file. The transfer itself
+    goes to the front server (PROTECTED_MEDIA['SERVER']) or, without one,
+    to a FileResponse that honours single byte ranges.
+    """
+    name = field_file.name
+    try:
+        path = field_file.storage.path(name)
+        stat = os.stat(path)
+    except (FileNotFoundError, NotImplementedError, ValueError):
+        raise Http404('File not found')
+    etag = _etag(name, stat)
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _transfer(request, name, path, stat.st_size, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if disposition := content_disposition_header(as_attachment, filename or os.path.basename(name)):
+        response['Content-Disposition'] = disposition
+    patch_cache_control(response, private=True, max_age=protected_media_settings()['MAX_AGE'])
+    return response
+
+
+def _transfer(request, name, path, size, etag, last_modified):
+    config = protected_media_settings()
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if config['SERVER'] == 'x-accel-redirect':
+        # nginx serves the body, including Range requests, from its internal location.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = config['ACCEL_PREFIX'] + quote(name)
+        return response
+    if config['SERVER'] == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    byte_range = None
+    if request.method == 'GET' and _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    asynchronous = isinstance(request, ASGIRequest)
+    if byte_range is None:
+        return MediaFileResponse(file, content_type=content_type, asynchronous=asynchronous)
+    start, end = byte_range
+    response = MediaFileResponse(RangeFile(file, start, end), status=206, content_type=content_type,
+                                 asynchronous=asynchronous)
+    response['Content-Length'] = end - start
+    response['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+    return response
@@ -0,0 +1,194 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from .auth import aget_user, get_user
+from .replica import SAFE_METHODS, replica_settings
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget_settings():
+    config = {
+        'ENABLED': settings.DEBUG,
+        'ENFORCE': False,
+        'DEFAULT': 50,
+        'VIEWS': {},
+        'N_PLUS_ONE_THRESHOLD': 5,
+        'LOG_FILE': None,
+    }
+    config.update(getattr(settings, 'QUERY_BUDGET', {}))
+    return config
+
+
+def fingerprint(sql):
+    """Reduce a SQL statement to its shape so repeated lookups group together."""
+    sql = _STRING_RE.sub('%s', sql)
+    sql = _NUMBER_RE.sub('%s', sql)
+    return _IN_LIST_RE.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, hits) for shape, hits in self.shapes.most_common() if hits >= threshold]
+
+
+class QueryBudgetMiddleware:
+    """
+    Records query count, DB time and repeated query shapes for every request,
+    keyed by URL name. Shapes repeated N_PLUS_ONE_THRESHOLD times or more are
+    reported as N+1 suspects; with ENFORCE on, going over a view's budget
+    raises QueryBudgetExceeded instead of returning the response.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = query_budget_settings()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.config['ENABLED']:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        if not self.config['ENABLED']:
+            return await self.get_response(request)
+
+        # Connections are per thread, and async ORM calls run on the request's
+        # thread-sensitive executor, so hook that thread's connections.
+        recorder = QueryRecorder()
+        stack = await sync_to_async(self.recording)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder)
+
+    def recording(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def report(self, request, response, recorder):
+        match = request.resolver_match
+        url_name = match.url_name if match and match.url_name else request.path
+        budget = self.config['VIEWS'].get(url_name, self.config['DEFAULT'])
+        suspects = recorder.repeated(self.config['N_PLUS_ONE_THRESHOLD'])
+
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-DB-Time-ms'] = f'{recorder.duration * 1000:.1f}'
+        self.record(request, url_name, budget, recorder, suspects)
+
+        for shape, hits in suspects:
+            logger.warning('N+1 suspect in %s: %d x %s', url_name, hits, shape)
+
+        if recorder.count > budget:
+            message = f'{url_name} ran {recorder.count} queries (budget {budget})'
+            if self.config['ENFORCE']:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
+
+    def record(self, request, url_name, budget, recorder, suspects):
+        log_file = self.config['LOG_FILE']
+        if not log_file:
+            return
+        entry = {
+            'url_name': url_name,
+            'method': request.method,
+            'queries': recorder.count,
+            'db_time_ms': round(recorder.duration * 1000, 3),
+            'budget': budget,
+            'suspects': [{'sql': shape, 'count': hits} for shape, hits in suspects],
+        }
+        with open(log_file, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps(entry) + '\n')
+
+
+class PrincipalAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Drop-in for AuthenticationMiddleware that builds request.user from the
+    cached principal (see e_learning_app.auth) instead of querying the user
+    table on every request.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = partial(aget_user, request)
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a client to the primary database for REPLICA['PIN_SECONDS'] after
+    any request that may have written, so replica_reads views do not show
+    it data older than its own writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS:
+            config = replica_settings()
+            response.set_cookie(config['PIN_COOKIE'], '1', max_age=config['PIN_SECONDS'],
+                                httponly=True, samesite='Lax')
+        return response
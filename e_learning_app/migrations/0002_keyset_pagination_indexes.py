@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['status', '-enrollment_date', '-id'], name='enrollment_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['-created_at', '-id'], name='feedback_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-payment_date', '-id'], name='payment_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-payment_date', '-id'], name='payment_status_date_idx'),
+        ),
+    ]
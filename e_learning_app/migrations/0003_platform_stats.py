@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_students', models.PositiveIntegerField(default=0)),
+                ('total_trainers', models.PositiveIntegerField(default=0)),
+                ('total_courses', models.PositiveIntegerField(default=0)),
+                ('total_enrollments', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'platform stats',
+            },
+        ),
+    ]
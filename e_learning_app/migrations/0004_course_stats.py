@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:45
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_course_stats(apps, schema_editor):
+    Course = apps.get_model('e_learning_app', 'Course')
+    Enrollment = apps.get_model('e_learning_app', 'Enrollment')
+    Feedback = apps.get_model('e_learning_app', 'Feedback')
+
+    def per_course(queryset, aggregate):
+        return Coalesce(models.Subquery(
+            queryset.filter(course=models.OuterRef('pk')).order_by().values('course').annotate(value=aggregate).values('value')
+        ), 0)
+
+    active = Enrollment.objects.filter(status='active')
+    Course.objects.update(
+        active_enrollment_count=per_course(active, models.Count('id')),
+        progress_sum=per_course(active, models.Sum('progress_percentage')),
+        rating_sum=per_course(Feedback.objects.all(), models.Sum('rating')),
+        rating_count=per_course(Feedback.objects.all(), models.Count('id')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0003_platform_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='active_enrollment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='progress_sum',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_course_stats, migrations.RunPython.noop),
+    ]
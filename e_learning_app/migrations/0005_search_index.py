@@ -0,0 +1,122 @@
+from django.db import migrations
+
+# The index as this migration creates it, copied from search.py rather than
+# imported, so later edits there cannot change what this migration does.
+
+# Full-text index over course, assignment and feedback text (SQLite FTS5).
+# rowid = source id * 4 + kind code, so triggers can replace a document by
+# rowid instead of scanning the index for it.
+TABLE_SQL = [
+    """
+    CREATE VIRTUAL TABLE e_learning_app_search USING fts5(
+        kind UNINDEXED, object_id UNINDEXED, course_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    "INSERT INTO e_learning_app_search(e_learning_app_search, rank) VALUES ('rank', 'bm25(0, 0, 0, 10.0, 1.0)')",
+]
+
+TRIGGER_SQL = [
+    """
+    CREATE TRIGGER search_course_ai AFTER INSERT ON e_learning_app_course BEGIN
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 1, 'course', new.id, new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_course_au AFTER UPDATE OF name, description ON e_learning_app_course BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 1;
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 1, 'course', new.id, new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_course_ad AFTER DELETE ON e_learning_app_course BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 1;
+    END
+    """,
+
+    """
+    CREATE TRIGGER search_assignment_ai AFTER INSERT ON e_learning_app_assignment BEGIN
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 2, 'assignment', new.id, new.course_id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_assignment_au AFTER UPDATE OF title, description, course_id ON e_learning_app_assignment BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 2;
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 2, 'assignment', new.id, new.course_id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_assignment_ad AFTER DELETE ON e_learning_app_assignment BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 2;
+    END
+    """,
+
+    """
+    CREATE TRIGGER search_feedback_ai AFTER INSERT ON e_learning_app_feedback BEGIN
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 3, 'feedback', new.id, new.course_id, '', new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER search_feedback_au AFTER UPDATE OF comment, course_id ON e_learning_app_feedback BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 3;
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 3, 'feedback', new.id, new.course_id, '', new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER search_feedback_ad AFTER DELETE ON e_learning_app_feedback BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 3;
+    END
+    """,
+]
+
+BACKFILL_SQL = [
+    """
+    INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+    SELECT id * 4 + 1, 'course', id, id, name, description FROM e_learning_app_course
+    """,
+    """
+    INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+    SELECT id * 4 + 2, 'assignment', id, course_id, title, description FROM e_learning_app_assignment
+    """,
+    """
+    INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+    SELECT id * 4 + 3, 'feedback', id, course_id, '', comment FROM e_learning_app_feedback
+    """,
+]
+
+DROP_SQL = [
+    *[f'DROP TRIGGER IF EXISTS search_{model}_{event}'
+      for model in ('course', 'assignment', 'feedback') for event in ('ai', 'au', 'ad')],
+    'DROP TABLE IF EXISTS e_learning_app_search',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            for sql in TABLE_SQL + TRIGGER_SQL + BACKFILL_SQL:
+                cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            for sql in DROP_SQL:
+                cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0004_course_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
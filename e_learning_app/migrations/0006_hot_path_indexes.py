@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['course', '-due_date'], name='assignment_course_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['created_by', '-due_date'], name='assignment_creator_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='course_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', 'status'], name='enrollment_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['course', '-enrollment_date', '-id'], name='enrollment_active_course_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:35
+
+import e_learning_app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='submission_file',
+            field=models.FileField(storage=e_learning_app.storage.submission_storage, upload_to='submissions/'),
+        ),
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refs', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('refs', 0)), fields=['updated_at'], name='blob_unreferenced_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0009_task_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key', ''), _negated=True), fields=('enrollment', 'idempotency_key'), name='payment_idempotency_key_uniq'),
+        ),
+    ]
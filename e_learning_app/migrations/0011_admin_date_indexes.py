@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0010_payment_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date', '-id'], name='attendance_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['-enrollment_date', '-id'], name='enrollment_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['-submitted_at', '-id'], name='submission_submitted_id_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('e_learning_app', '0011_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='payment',
+            name='payment_status_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-payment_date', '-id'], name='payment_pending_date_idx'),
+        ),
+    ]
@@ -1,6 +1,13 @@
-from django.db import models
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.db import connections, models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .storage import submission_storage
 
 class User(AbstractUser):
     USER_TYPE_CHOICES = (
@@ -17,6 +24,37 @@ class User(AbstractUser):
         return f"{self.username} ({self.user_type})"
 
 
+COURSE_STAT_FIELDS = ('active_enrollment_count', 'progress_sum', 'rating_sum', 'rating_count')
+
+
+class CourseQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('trainer')
+    
+    def with_exact_stats(self):
+        """Annotate exact_<field> for every denormalized stat column (used to detect drift)."""
+        return self.annotate(**{f'exact_{field}': expression for field, expression in _course_stat_expressions().items()})
+    
+    def rebuild_stats(self):
+        """Recompute the denormalized stat columns in a single UPDATE."""
+        return self.update(**_course_stat_expressions())
+
+
+def _course_stat_expressions():
+    def per_course(queryset, aggregate):
+        return Coalesce(models.Subquery(
+            queryset.filter(course=models.OuterRef('pk')).order_by().values('course').annotate(value=aggregate).values('value')
+        ), 0)
+    
+    active = Enrollment.objects.filter(status='active')
+    return {
+        'active_enrollment_count': per_course(active, models.Count('id')),
+        'progress_sum': per_course(active, models.Sum('progress_percentage')),
+        'rating_sum': per_course(Feedback.objects.all(), models.Sum('rating')),
+        'rating_count': per_course(Feedback.objects.all(), models.Count('id')),
+    }
+
+
 class Course(models.Model):
     DIFFICULTY_CHOICES = (
         ('beginner', 'Beginner'),
@@ -33,12 +71,86 @@ class Course(models.Model):
                                 related_name='courses_teaching', limit_choices_to={'user_type': 'trainer'})
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    # Denormalized from Enrollment/Feedback by signals.py; `manage.py recount` repairs them.
+    active_enrollment_count = models.PositiveIntegerField(default=0)
+    progress_sum = models.PositiveBigIntegerField(default=0)
+    rating_sum = models.PositiveBigIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    
+    objects = CourseQuerySet.as_manager()
     
     def __str__(self):
         return self.name
     
+    @property
+    def avg_progress(self):
+        # Over active enrollments only; pending and dropped ones are not counted.
+        if not self.active_enrollment_count:
+            return 0
+        return self.progress_sum / self.active_enrollment_count
+    
+    @property
+    def avg_rating(self):
+        if not self.rating_count:
+            return 0
+        return self.rating_sum / self.rating_count
+    
+    @classmethod
+    def bump_stats(cls, course_id, **deltas):
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if course_id and deltas:
+            cls.objects.filter(pk=course_id).update(**{field: models.F(field) + delta for field, delta in deltas.items()})
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The public catalog only ever lists active courses.
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True), name='course_active_created_idx'),
+        ]
+
+
+class EnrollmentQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Roster tables: student name and course name per row."""
+        return self.select_related('student', 'course').only(
+            'id', 'status', 'progress_percentage', 'enrollment_date',
+            'student__id', 'student__username', 'student__first_name', 'student__last_name', 'student__user_type',
+            'course__id', 'course__name',
+        )
+    
+    def for_student(self):
+        """A student's own enrollments, with the course and its trainer."""
+        return self.select_related('course', 'course__trainer')
+    
+    def enroll(self, student, course):
+        """
+        Enroll ``student`` in ``course`` as pending unless they already are,
+        and return ``(id, status)`` of the one enrollment either way. On
+        SQLite and PostgreSQL this is a single INSERT ... ON CONFLICT ...
+        RETURNING, so concurrent requests never race into the unique
+        constraint. The no-op DO UPDATE makes RETURNING yield the existing row
+        too. No save signals fire, which is safe because a pending enrollment
+        adds nothing to the course or platform stats.
+        """
+        connection = connections[self.db]
+        if connection.vendor not in ('sqlite', 'postgresql') or not connection.features.can_return_columns_from_insert:
+            enrollment, _ = self.get_or_create(student=student, course=course, defaults={'status': 'pending'})
+            return enrollment.pk, enrollment.status
+        
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        date_field = self.model._meta.get_field('enrollment_date')
+        sql = (
+            f'INSERT INTO {table} ({qn("student_id")}, {qn("course_id")}, {qn("enrollment_date")}, '
+            f'{qn("status")}, {qn("progress_percentage")}) VALUES (%s, %s, %s, %s, 0) '
+            f'ON CONFLICT ({qn("student_id")}, {qn("course_id")}) DO UPDATE SET {qn("status")} = {table}.{qn("status")} '
+            f'RETURNING {qn("id")}, {qn("status")}'
+        )
+        params = [getattr(student, 'pk', student), getattr(course, 'pk', course),
+                  date_field.get_db_prep_value(timezone.now(), connection), 'pending']
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return tuple(cursor.fetchone())
 
 
 class Enrollment(models.Model):
@@ -48,6 +160,8 @@ class Enrollment(models.Model):
         ('completed', 'Completed'),
         ('dropped', 'Dropped'),
     )
+    # Statuses a completed payment has already unlocked.
+    PAID_STATUSES = ('active', 'completed')
     
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments',
                                 limit_choices_to={'user_type': 'student'})
@@ -56,14 +170,30 @@ class Enrollment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     progress_percentage = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(100)])
     
+    objects = EnrollmentQuerySet.as_manager()
+    
     class Meta:
         unique_together = ('student', 'course')
         ordering = ['-enrollment_date']
+        indexes = [
+            models.Index(fields=['status', '-enrollment_date', '-id'], name='enrollment_status_date_idx'),
+            models.Index(fields=['student', 'status'], name='enrollment_student_status_idx'),
+            # The admin changelist's order and its date drilldown.
+            models.Index(fields=['-enrollment_date', '-id'], name='enrollment_date_id_idx'),
+            # Rosters are always active enrollments of one course.
+            models.Index(fields=['course', '-enrollment_date', '-id'], condition=models.Q(status='active'),
+                         name='enrollment_active_course_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.course.name}"
 
 
+class PaymentQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('enrollment__student', 'enrollment__course')
+
+
 class Payment(models.Model):
     PAYMENT_STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -87,12 +217,42 @@ class Payment(models.Model):
     transaction_id = models.CharField(max_length=100, unique=True, blank=True)
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
+    # Sent by the client with each payment attempt; a retried POST carrying
+    # the same key is answered from this row instead of paying twice.
+    idempotency_key = models.CharField(max_length=64, blank=True)
+    
+    objects = PaymentQuerySet.as_manager()
     
     def __str__(self):
         return f"Payment for {self.enrollment} - ₹{self.amount}"
     
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['-payment_date', '-id'], name='payment_date_id_idx'),
+            # Managers filter for pending payments to chase them up; the other
+            # statuses are most rows, and read the date index above.
+            models.Index(fields=['-payment_date', '-id'], condition=models.Q(status='pending'),
+                         name='payment_pending_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['enrollment', 'idempotency_key'], condition=~models.Q(idempotency_key=''),
+                                    name='payment_idempotency_key_uniq'),
+        ]
+
+
+class AssignmentQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('course')
+    
+    def with_submission_counts(self):
+        return self.for_listing().annotate(submission_count=models.Count('submissions'))
+    
+    def with_submission_for(self, student):
+        """Attach ``student``'s own submission (or None) to each assignment as ``my_submission``."""
+        return self.for_listing().prefetch_related(models.Prefetch(
+            'submissions', queryset=Submission.objects.filter(student=student), to_attr='my_submissions',
+        ))
 
 
 class Assignment(models.Model):
@@ -104,18 +264,35 @@ class Assignment(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'user_type': 'trainer'})
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = AssignmentQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.course.name} - {self.title}"
     
+    @property
+    def my_submission(self):
+        submissions = getattr(self, 'my_submissions', None)
+        return submissions[0] if submissions else None
+    
     class Meta:
         ordering = ['-due_date']
+        indexes = [
+            models.Index(fields=['course', '-due_date'], name='assignment_course_due_idx'),
+            models.Index(fields=['created_by', '-due_date'], name='assignment_creator_due_idx'),
+        ]
+
+
+class SubmissionQuerySet(models.QuerySet):
+    def for_gradebook(self):
+        """Submissions with the student, assignment and grader a trainer sees."""
+        return self.select_related('student', 'assignment', 'assignment__course', 'graded_by')
 
 
 class Submission(models.Model):
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='submissions',
                                 limit_choices_to={'user_type': 'student'})
-    submission_file = models.FileField(upload_to='submissions/')
+    submission_file = models.FileField(upload_to='submissions/', storage=submission_storage)
     submission_text = models.TextField(blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
     marks_obtained = models.IntegerField(null=True, blank=True)
@@ -124,14 +301,75 @@ class Submission(models.Model):
                                   related_name='graded_submissions', limit_choices_to={'user_type': 'trainer'})
     graded_at = models.DateTimeField(null=True, blank=True)
     
+    objects = SubmissionQuerySet.as_manager()
+    
     class Meta:
         unique_together = ('assignment', 'student')
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['-submitted_at', '-id'], name='submission_submitted_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.assignment.title}"
 
 
+class ChunkedUpload(models.Model):
+    """
+    A resumable submission upload in progress. Chunks are written straight
+    into a part file under CHUNKED_UPLOADS['DIR']; ``offset`` is how many
+    bytes of it are confirmed, so a client resumes by asking for it.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'assignment'], name='chunked_upload_owner_idx'),
+            models.Index(fields=['updated_at'], name='chunked_upload_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
+    
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+
+class Blob(models.Model):
+    """
+    One stored file of ContentAddressedStorage and the number of saved
+    file fields that point at it. Blobs at zero references are swept by
+    `manage.py gc_blobs`.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    refs = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], condition=models.Q(refs=0), name='blob_unreferenced_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.refs} refs)"
+
+
+class FeedbackQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('student', 'course')
+
+
 class Feedback(models.Model):
     RATING_CHOICES = [(i, str(i)) for i in range(1, 6)]
     
@@ -142,14 +380,24 @@ class Feedback(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = FeedbackQuerySet.as_manager()
+    
     class Meta:
         unique_together = ('student', 'course')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='feedback_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"Feedback by {self.student.username} for {self.course.name}"
 
 
+class AttendanceQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('enrollment__student', 'enrollment__course', 'marked_by')
+
+
 class Attendance(models.Model):
     STATUS_CHOICES = (
         ('present', 'Present'),
@@ -164,9 +412,105 @@ class Attendance(models.Model):
     marked_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
                                   limit_choices_to={'user_type': 'trainer'})
     
+    objects = AttendanceQuerySet.as_manager()
+    
     class Meta:
         unique_together = ('enrollment', 'date')
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='attendance_date_id_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.enrollment.student.username} - {self.date} - {self.status}"
+
+
+class PlatformStats(models.Model):
+    """
+    Single-row table of the manager dashboard totals, kept current by the
+    signal handlers in signals.py so the dashboard is one primary-key read.
+    Run `manage.py recount` to rebuild it or `recount --check` to report drift.
+    """
+    total_students = models.PositiveIntegerField(default=0)
+    total_trainers = models.PositiveIntegerField(default=0)
+    total_courses = models.PositiveIntegerField(default=0)
+    total_enrollments = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'platform stats'
+    
+    def __str__(self):
+        return f"Platform stats (updated {self.updated_at:%Y-%m-%d %H:%M})"
+    
+    @staticmethod
+    def compute():
+        return {
+            'total_students': User.objects.filter(user_type='student').count(),
+            'total_trainers': User.objects.filter(user_type='trainer').count(),
+            'total_courses': Course.objects.count(),
+            'total_enrollments': Enrollment.objects.filter(status='active').count(),
+        }
+    
+    @classmethod
+    def current(cls):
+        stats = cls.objects.filter(pk=1).first()
+        return stats if stats is not None else cls.rebuild()
+    
+    @classmethod
+    async def acurrent(cls):
+        stats = await cls.objects.filter(pk=1).afirst()
+        return stats if stats is not None else await sync_to_async(cls.rebuild)()
+    
+    @classmethod
+    def rebuild(cls):
+        stats, _ = cls.objects.update_or_create(pk=1, defaults=cls.compute())
+        return stats
+    
+    @classmethod
+    def bump(cls, **deltas):
+        """Apply counter deltas atomically in the database (safe across workers)."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updates = {field: models.F(field) + delta for field, delta in deltas.items()}
+        if not cls.objects.filter(pk=1).update(**updates):
+            cls.rebuild()
+
+
+class Task(models.Model):
+    """
+    A unit of deferred work for `manage.py run_tasks`, stored in the main
+    database so no broker is needed. ``name`` is the dotted path of a
+    function decorated with tasks.task; see tasks.py for the lifecycle.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_at', 'id'], condition=models.Q(status='queued'), name='task_queued_idx'),
+            models.Index(fields=['claimed_at'], condition=models.Q(status='running'), name='task_running_idx'),
+            models.Index(fields=['finished_at'], condition=models.Q(status='done'), name='task_done_idx'),
+            models.Index(fields=['claimed_by'], condition=models.Q(status='running'), name='task_claim_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.enrollment.student.username} - {self.date} - {self.status}"
\ No newline at end of file
+        return f"{self.name} ({self.status}, attempt {self.attempts}/{self.max_attempts})"
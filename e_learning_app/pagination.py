@@ -0,0 +1,150 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, object_list, request, next_values, prev_values):
+        self.object_list = object_list
+        self.request = request
+        self.next_cursor = encode_cursor(next_values) if next_values else None
+        self.prev_cursor = encode_cursor(prev_values) if prev_values else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def _querystring(self, param, cursor):
+        params = self.request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[param] = cursor
+        return params.urlencode()
+
+    def next_querystring(self):
+        return self._querystring('after', self.next_cursor)
+
+    def prev_querystring(self):
+        return self._querystring('before', self.prev_cursor)
+
+
+def paginate_keyset(queryset, request, key, per_page=PAGE_SIZE):
+    """
+    Cursor pagination over ``key`` (e.g. '-payment_date') with ``id`` as the
+    tie-breaker. Pages are fetched with a range condition on (key, id) instead
+    of OFFSET, so every page costs an index seek no matter how deep it is.
+    The ?after= / ?before= cursors are opaque and other GET parameters
+    (filters) are carried over to the next/previous links.
+    """
+    descending = key.startswith('-')
+    name = key.lstrip('-')
+    fields = [queryset.model._meta.get_field(name), queryset.model._meta.pk]
+
+    def seek(values, forward):
+        # Moving forward through a descending ordering means smaller keys.
+        # The leading inclusive bound on the key alone gives the index a
+        # range to seek into; the OR only settles ties on that key.
+        lookup = 'lt' if forward == descending else 'gt'
+        key_value, pk_value = values
+        return Q(**{f'{name}__{lookup}e': key_value}) & (
+            Q(**{f'{name}__{lookup}': key_value}) | Q(**{f'id__{lookup}': pk_value})
+        )
+
+    def ordering(forward):
+        prefix = '-' if forward == descending else ''
+        return [f'{prefix}{name}', f'{prefix}id']
+
+    after = decode_cursor(request.GET['after'], fields) if request.GET.get('after') else None
+    before = decode_cursor(request.GET['before'], fields) if request.GET.get('before') else None
+
+    if before:
+        rows = list(queryset.filter(seek(before, forward=False)).order_by(*ordering(False))[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_prev, has_next = has_more, True
+    else:
+        if after:
+            queryset = queryset.filter(seek(after, forward=True))
+        rows = list(queryset.order_by(*ordering(True))[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    def values(row):
+        return [getattr(row, name), row.pk]
+
+    next_values = values(rows[-1]) if rows and has_next else None
+    prev_values = values(rows[0]) if rows and has_prev else None
+    return KeysetPage(rows, request, next_values, prev_values)
+
+
+def estimated_row_count(model, using):
+    """
+    A cheap guess at the number of rows in ``model``'s table, or None when
+    the backend cannot make one. PostgreSQL's planner statistics lag by up
+    to an autovacuum cycle; on SQLite the highest rowid overcounts by the
+    rows deleted since.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 for a table that has never been analyzed.
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over tables too big to COUNT(*) on
+    every page view. Up to ``exact_limit`` rows the count is exact. Past
+    it, an unfiltered list is sized by estimated_row_count(), and a
+    filtered one is counted only as far as the limit, so its later pages
+    are not linked (narrow the filter to reach them).
+    """
+    exact_limit = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.exact_limit:
+                return estimate
+        return queryset.order_by()[:self.exact_limit].count()
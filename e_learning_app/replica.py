@@ -0,0 +1,135 @@
+"""
+Read replica routing for heavy, read-only manager pages.
+
+Views decorated with @replica_reads run their queries against the
+``replica`` database alias, through ReplicaRouter. Writes always go to the
+primary. Three cases stay on the primary:
+
+- The user wrote something in the last PIN_SECONDS. ReplicaPinMiddleware
+  sets a short-lived cookie after every unsafe request, so users see their
+  own writes.
+- The replica is not configured.
+- The replica recently failed. A view that hits a database error on the
+  replica is run again on the primary, and the replica is skipped for
+  RETRY_SECONDS.
+
+Locally the replica is a read-only SQLite file, refreshed from the primary
+by `manage.py sync_replica`.
+"""
+import contextvars
+import functools
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_reading_replica = contextvars.ContextVar('reading_replica', default=False)
+_replica_down_until = 0.0
+
+
+def replica_settings():
+    config = {
+        'ALIAS': 'replica',
+        # Seconds a user's reads stay on the primary after they write.
+        'PIN_SECONDS': 10,
+        'PIN_COOKIE': 'replica_pin',
+        # Seconds the replica is skipped after it fails.
+        'RETRY_SECONDS': 30,
+        # SQLite snapshot written by `manage.py sync_replica`.
+        'SNAPSHOT_PATH': None,
+    }
+    config.update(getattr(settings, 'REPLICA', {}))
+    return config
+
+
+class ReplicaRouter:
+    """Sends reads to the replica inside @replica_reads views, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        # Only the app's own tables: sessions, permissions and content types
+        # are always read fresh.
+        if _reading_replica.get() and model._meta.app_label == 'e_learning_app':
+            return replica_settings()['ALIAS']
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and is never migrated itself.
+        return db != replica_settings()['ALIAS']
+
+
+def replica_available():
+    alias = replica_settings()['ALIAS']
+    return alias in settings.DATABASES and time.monotonic() >= _replica_down_until
+
+
+def _use_replica(request):
+    return (request.method in SAFE_METHODS and replica_available()
+            and replica_settings()['PIN_COOKIE'] not in request.COOKIES)
+
+
+def _replica_failed(exc):
+    global _replica_down_until
+    retry = replica_settings()['RETRY_SECONDS']
+    _replica_down_until = time.monotonic() + retry
+    logger.warning('Replica query failed (%s); reading from the primary for %ss.', exc, retry)
+
+
+def _rendered(response):
+    # Render lazy (Template)Responses here, so their queries also run on the replica.
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    return response
+
+
+def replica_reads(view):
+    """
+    Run a read-only view's queries on the replica when it is healthy and
+    the user is not pinned to the primary. A database error on the replica
+    runs the view again on the primary. Streaming responses, which query
+    after the view returns, should not use this.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if _use_replica(request):
+                token = _reading_replica.set(True)
+                try:
+                    return _rendered(await view(request, *args, **kwargs))
+                except DatabaseError as exc:
+                    _replica_failed(exc)
+                finally:
+                    _reading_replica.reset(token)
+            return await view(request, *args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if _use_replica(request):
+                token = _reading_replica.set(True)
+                try:
+                    return _rendered(view(request, *args, **kwargs))
+                except DatabaseError as exc:
+                    _replica_failed(exc)
+                finally:
+                    _reading_replica.reset(token)
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaChangeListMixin:
+    """ModelAdmin mixin that reads changelist pages from the replica."""
+
+    def changelist_view(self, request, extra_context=None):
+        return replica_reads(super().changelist_view)(request, extra_context)
@@ -0,0 +1,208 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_TABLE = 'e_learning_app_search'
+SEARCH_KINDS = ('course', 'assignment', 'feedback')
+
+# Control characters FTS5 wraps matches in; swapped for <mark> after escaping.
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+# Full-text index over course, assignment and feedback text (SQLite FTS5).
+# rowid = source id * 4 + kind code, so triggers can replace a document by
+# rowid instead of scanning the index for it.
+TABLE_SQL = [
+    """
+    CREATE VIRTUAL TABLE e_learning_app_search USING fts5(
+        kind UNINDEXED, object_id UNINDEXED, course_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    "INSERT INTO e_learning_app_search(e_learning_app_search, rank) VALUES ('rank', 'bm25(0, 0, 0, 10.0, 1.0)')",
+]
+
+TRIGGER_SQL = [
+    """
+    CREATE TRIGGER search_course_ai AFTER INSERT ON e_learning_app_course BEGIN
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 1, 'course', new.id, new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_course_au AFTER UPDATE OF name, description ON e_learning_app_course BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 1;
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 1, 'course', new.id, new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_course_ad AFTER DELETE ON e_learning_app_course BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 1;
+    END
+    """,
+
+    """
+    CREATE TRIGGER search_assignment_ai AFTER INSERT ON e_learning_app_assignment BEGIN
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 2, 'assignment', new.id, new.course_id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_assignment_au AFTER UPDATE OF title, description, course_id ON e_learning_app_assignment BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 2;
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 2, 'assignment', new.id, new.course_id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_assignment_ad AFTER DELETE ON e_learning_app_assignment BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 2;
+    END
+    """,
+
+    """
+    CREATE TRIGGER search_feedback_ai AFTER INSERT ON e_learning_app_feedback BEGIN
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 3, 'feedback', new.id, new.course_id, '', new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER search_feedback_au AFTER UPDATE OF comment, course_id ON e_learning_app_feedback BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 3;
+        INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+        VALUES (new.id * 4 + 3, 'feedback', new.id, new.course_id, '', new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER search_feedback_ad AFTER DELETE ON e_learning_app_feedback BEGIN
+        DELETE FROM e_learning_app_search WHERE rowid = old.id * 4 + 3;
+    END
+    """,
+]
+
+BACKFILL_SQL = [
+    """
+    INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+    SELECT id * 4 + 1, 'course', id, id, name, description FROM e_learning_app_course
+    """,
+    """
+    INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+    SELECT id * 4 + 2, 'assignment', id, course_id, title, description FROM e_learning_app_assignment
+    """,
+    """
+    INSERT INTO e_learning_app_search(rowid, kind, object_id, course_id, title, body)
+    SELECT id * 4 + 3, 'feedback', id, course_id, '', comment FROM e_learning_app_feedback
+    """,
+]
+
+DROP_SQL = [
+    *[f'DROP TRIGGER IF EXISTS search_{model}_{event}'
+      for model in ('course', 'assignment', 'feedback') for event in ('ai', 'au', 'ad')],
+    'DROP TABLE IF EXISTS e_learning_app_search',
+]
+
+
+def install(cursor):
+    for sql in TABLE_SQL + TRIGGER_SQL + BACKFILL_SQL:
+        cursor.execute(sql)
+
+
+def uninstall(cursor):
+    for sql in DROP_SQL:
+        cursor.execute(sql)
+
+
+def ensure_index(using_connection=connection):
+    """
+    Recreate missing triggers and rebuild the index. SQLite drops a table's
+    triggers whenever a migration rebuilds that table, so this runs after
+    every migrate.
+    """
+    if using_connection.vendor != 'sqlite':
+        return False
+    with using_connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'search_%'")
+        present = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [SEARCH_TABLE])
+        if not cursor.fetchone():
+            return False
+        if len(present) == len(TRIGGER_SQL):
+            return False
+        rebuild(cursor)
+    return True
+
+
+def rebuild(cursor):
+    """Drop and recreate every trigger, then reload the index from the source tables."""
+    for sql in DROP_SQL[:-1]:
+        cursor.execute(sql)
+    cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    for sql in TRIGGER_SQL + BACKFILL_SQL:
+        cursor.execute(sql)
+    cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def match_expression(query):
+    """Turn free text into a safe FTS5 query: every word quoted, the last one as a prefix."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _marked(text):
+    return mark_safe(escape(text).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def search(query, kinds=SEARCH_KINDS, course_ids=None, include_inactive=False, limit=20):
+    """
+    BM25-ranked documents matching ``query``, each a dict with kind,
+    object_id, course_id, course_name and highlighted title/snippet.
+    ``course_ids`` limits non-course documents to those courses.
+    """
+    expression = match_expression(query)
+    if expression is None or connection.vendor != 'sqlite':
+        return []
+
+    sql = [
+        f"""SELECT {SEARCH_TABLE}.kind, object_id, course_id, c.name,
+               highlight({SEARCH_TABLE}, 3, %s, %s), snippet({SEARCH_TABLE}, 4, %s, %s, '…', 16)
+        FROM {SEARCH_TABLE} JOIN e_learning_app_course c ON c.id = course_id
+        WHERE {SEARCH_TABLE} MATCH %s AND {SEARCH_TABLE}.kind IN ({', '.join(['%s'] * len(kinds))})""",
+    ]
+    params = [_MARK_START, _MARK_END, _MARK_START, _MARK_END, expression, *kinds]
+    if not include_inactive:
+        sql.append('AND c.is_active')
+    if course_ids is not None:
+        course_ids = list(course_ids) or [0]
+        sql.append(f"AND ({SEARCH_TABLE}.kind = 'course' OR course_id IN ({', '.join(['%s'] * len(course_ids))}))")
+        params.extend(course_ids)
+    sql.append('ORDER BY rank LIMIT %s')
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        rows = cursor.fetchall()
+    return [
+        {'kind': kind, 'object_id': object_id, 'course_id': course_id, 'course_name': course_name,
+         'title': _marked(title), 'snippet': _marked(snippet)}
+        for kind, object_id, course_id, course_name, title, snippet in rows
+    ]
+
+
+def matching_ids(query, kind):
+    """
+    Subquery of the object ids of ``kind`` matching ``query``, for
+    ``filter(id__in=...)`` (used by the admin), or None when the query has
+    no searchable words. Unlike search(), it is neither ranked nor limited.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return None
+    return RawSQL(f'SELECT object_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND kind = %s',
+                  (expression, kind))
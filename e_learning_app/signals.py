@@ -0,0 +1,217 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .auth import PRINCIPAL_SOURCE_FIELDS, invalidate_principal
+from .catalog import invalidate_catalog
+from .thumbnails import generate_variants, remove_variants
+from .models import User, Course, Enrollment, Submission, Feedback, PlatformStats
+
+USER_TYPE_COUNTERS = {
+    'student': 'total_students',
+    'trainer': 'total_trainers',
+}
+
+
+def _field_names(fields):
+    return {field.removesuffix('_id') for field in fields}
+
+
+def _previous_values(sender, instance, fields, update_fields):
+    """
+    Values of ``fields`` as stored before this save, or None for new rows.
+    Fields left out of ``update_fields`` cannot change, so they are read off
+    the instance instead of costing a query.
+    """
+    if instance._state.adding or instance.pk is None:
+        return None
+    if update_fields is not None and not _field_names(fields) & _field_names(update_fields):
+        return {field: getattr(instance, field) for field in fields}
+    return sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+# ============= PLATFORM COUNTERS =============
+@receiver(pre_save, sender=User)
+def remember_user_type(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        previous = _previous_values(sender, instance, ['user_type'], update_fields)
+        instance._previous_user_type = previous['user_type'] if previous else None
+
+
+@receiver(post_save, sender=User)
+def count_saved_user(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_user_type', None)
+    if previous == instance.user_type and not created:
+        return
+    deltas = {}
+    if previous in USER_TYPE_COUNTERS and not created:
+        deltas[USER_TYPE_COUNTERS[previous]] = -1
+    if instance.user_type in USER_TYPE_COUNTERS:
+        field = USER_TYPE_COUNTERS[instance.user_type]
+        deltas[field] = deltas.get(field, 0) + 1
+    PlatformStats.bump(**deltas)
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    if instance.user_type in USER_TYPE_COUNTERS:
+        PlatformStats.bump(**{USER_TYPE_COUNTERS[instance.user_type]: -1})
+
+
+@receiver(post_save, sender=Course)
+def count_saved_course(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        PlatformStats.bump(total_courses=1)
+
+
+@receiver(post_delete, sender=Course)
+def count_deleted_course(sender, instance, **kwargs):
+    PlatformStats.bump(total_courses=-1)
+
+
+# ============= ENROLLMENT & FEEDBACK STATS =============
+def _enrollment_contribution(values):
+    """What one enrollment adds to its course's stat columns."""
+    if not values or values['status'] != 'active':
+        return {}
+    return {'active_enrollment_count': 1, 'progress_sum': values['progress_percentage']}
+
+
+def _feedback_contribution(values):
+    if not values:
+        return {}
+    return {'rating_count': 1, 'rating_sum': values['rating']}
+
+
+def _apply_contribution_change(old, new, contribution):
+    """Move a row's contribution from its old course to its new one (usually the same course)."""
+    before, after = contribution(old), contribution(new)
+    old_course = old['course_id'] if old else None
+    if old_course == new['course_id']:
+        fields = set(before) | set(after)
+        Course.bump_stats(new['course_id'], **{f: after.get(f, 0) - before.get(f, 0) for f in fields})
+    else:
+        Course.bump_stats(old_course, **{f: -v for f, v in before.items()})
+        Course.bump_stats(new['course_id'], **after)
+
+
+ENROLLMENT_STAT_FIELDS = ['course_id', 'status', 'progress_percentage']
+FEEDBACK_STAT_FIELDS = ['course_id', 'rating']
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        instance._previous_values = _previous_values(sender, instance, ENROLLMENT_STAT_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Enrollment)
+def count_saved_enrollment(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else getattr(instance, '_previous_values', None)
+    new = {field: getattr(instance, field) for field in ENROLLMENT_STAT_FIELDS}
+    was_active = bool(old) and old['status'] == 'active'
+    PlatformStats.bump(total_enrollments=int(new['status'] == 'active') - int(was_active))
+    _apply_contribution_change(old, new, _enrollment_contribution)
+
+
+@receiver(post_delete, sender=Enrollment)
+def count_deleted_enrollment(sender, instance, **kwargs):
+    if instance.status == 'active':
+        PlatformStats.bump(total_enrollments=-1)
+    old = {field: getattr(instance, field) for field in ENROLLMENT_STAT_FIELDS}
+    Course.bump_stats(old['course_id'], **{f: -v for f, v in _enrollment_contribution(old).items()})
+
+
+@receiver(pre_save, sender=Feedback)
+def remember_feedback(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        instance._previous_values = _previous_values(sender, instance, FEEDBACK_STAT_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Feedback)
+def count_saved_feedback(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else getattr(instance, '_previous_values', None)
+    new = {field: getattr(instance, field) for field in FEEDBACK_STAT_FIELDS}
+    _apply_contribution_change(old, new, _feedback_contribution)
+
+
+@receiver(post_delete, sender=Feedback)
+def count_deleted_feedback(sender, instance, **kwargs):
+    old = {field: getattr(instance, field) for field in FEEDBACK_STAT_FIELDS}
+    Course.bump_stats(old['course_id'], **{f: -v for f, v in _feedback_contribution(old).items()})
+
+
+# ============= COURSE CATALOG CACHE =============
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_catalog(sender, **kwargs):
+    # After commit, so a concurrent request cannot re-cache the old rows.
+    transaction.on_commit(invalidate_catalog)
+
+
+# ============= AUTH PRINCIPAL CACHE =============
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, update_fields=None, **kwargs):
+    # Logins save only last_login, which the principal does not hold.
+    if update_fields is not None and not PRINCIPAL_SOURCE_FIELDS.intersection(update_fields):
+        return
+    transaction.on_commit(lambda: invalidate_principal(instance.pk))
+
+
+# ============= PROFILE PICTURE THUMBNAILS =============
+@receiver(pre_save, sender=User)
+def remember_profile_picture(sender, instance, raw=False, **kwargs):
+    # As with submission files, only a newly assigned upload (not yet
+    # committed to storage) changes the picture; other saves cost nothing.
+    instance._new_picture = not raw and bool(instance.profile_picture) and not instance.profile_picture._committed
+    instance._previous_picture = None
+    if instance._new_picture and not instance._state.adding:
+        instance._previous_picture = sender.objects.filter(pk=instance.pk).values_list(
+            'profile_picture', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def thumbnail_profile_picture(sender, instance, raw=False, **kwargs):
+    if raw or not getattr(instance, '_new_picture', False):
+        return
+    # Queued in the saving transaction, so the work runs if and only if the new picture is committed.
+    previous = instance._previous_picture
+    if previous and previous != instance.profile_picture.name:
+        remove_variants.delay(previous)
+    generate_variants.delay(instance.pk)
+
+
+# ============= SUBMISSION FILE REFERENCES =============
+def _release_file(storage, name):
+    """Drop one storage reference once the transaction that stopped using the file commits."""
+    transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(pre_save, sender=Submission)
+def remember_submission_file(sender, instance, raw=False, **kwargs):
+    # Only a newly assigned upload (not yet committed to storage) can replace
+    # the stored file, so ordinary saves such as grading cost no extra query.
+    instance._previous_file = None
+    if not raw and not instance._state.adding and not instance.submission_file._committed:
+        instance._previous_file = sender.objects.filter(pk=instance.pk).values_list(
+            'submission_file', flat=True).first()
+
+
+@receiver(post_save, sender=Submission)
+def release_replaced_submission_file(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_file', None)
+    if previous and previous != instance.submission_file.name:
+        _release_file(instance.submission_file.storage, previous)
+
+
+@receiver(post_delete, sender=Submission)
+def release_deleted_submission_file(sender, instance, **kwargs):
+    if instance.submission_file:
+        _release_file(instance.submission_file.storage, instance.submission_file.name)
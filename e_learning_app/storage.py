@@ -0,0 +1,135 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+SUBMISSION_STORAGE = 'submissions'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# <upload_to>/<first two hex digits>/<sha256><.ext>
+BLOB_EXTENSION = re.compile(r'\.[a-z0-9]+')
+BLOB_NAME = re.compile(rf'(?:^|/)[0-9a-f]{{2}}/[0-9a-f]{{64}}(?:{BLOB_EXTENSION.pattern})?$')
+
+
+def submission_storage():
+    """Storage for Submission.submission_file, configurable as STORAGES['submissions']."""
+    return storages[SUBMISSION_STORAGE]
+
+
+def is_blob_name(name):
+    return bool(name) and BLOB_NAME.search(name) is not None
+
+
+def blob_storages():
+    """(model, field, storage) for every file field stored in a ContentAddressedStorage."""
+    from django.apps import apps
+    from django.db.models import FileField
+
+    return [
+        (model, field, field.storage)
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps one copy of each distinct upload.
+
+    An upload is hashed (SHA-256, streamed in chunks) before anything is
+    written, and stored as ``<upload_to>/<ab>/<digest><.ext>``. If that blob
+    already exists the save writes nothing and only adds a reference. Each
+    saved name gets a ``Blob`` row counting the references to it. delete()
+    only drops a reference; files left with no references are removed by
+    ``manage.py gc_blobs``, which can also recount references from the
+    database. Names saved before this storage was used are served and
+    deleted as plain files.
+
+    The reference is taken when the file field is saved, before the row is
+    written, so save the model inside ``transaction.atomic()``: if the row
+    fails to save, the reference rolls back with it. Outside a transaction
+    it is left behind, and the blob is kept until ``gc_blobs --recount``.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save(), so the upload's
+        # own name never needs a collision check.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        digest = self.digest(content)
+        extension = os.path.splitext(filename)[1].lower()
+        if not BLOB_EXTENSION.fullmatch(extension):
+            # Every saved name must pass is_blob_name(), or delete() would
+            # unlink a file that other rows still share.
+            extension = ''
+        blob_name = f'{directory}/{digest[:2]}/{digest}{extension}'.lstrip('/')
+        # Reference first, then check the file: gc_blobs moves a blob aside
+        # before deleting its row, so a blob it is collecting reads as missing
+        # here and is written again rather than left dangling.
+        self.add_reference(blob_name, content.size)
+        if not self.exists(blob_name):
+            self.write_blob(blob_name, content)
+        return blob_name
+
+    def digest(self, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def write_blob(self, name, content):
+        """
+        Write ``content`` next to its final path and rename it into place.
+        Two uploads racing on the same new blob both write identical bytes,
+        so whichever rename lands last is as good as the first.
+        """
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), mode=self.directory_permissions_mode or 0o777, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                os.close(fd)
+                file_move_safe(content.temporary_file_path(), tmp_path, allow_overwrite=True)
+            else:
+                with os.fdopen(fd, 'wb') as fh:
+                    for chunk in content.chunks():
+                        fh.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def add_reference(self, name, size):
+        from .models import Blob
+
+        now = timezone.now()
+        with transaction.atomic():
+            if Blob.objects.filter(name=name).update(refs=F('refs') + 1, updated_at=now):
+                return
+            try:
+                with transaction.atomic():
+                    Blob.objects.create(name=name, size=size, refs=1, updated_at=now)
+            except IntegrityError:
+                # Another upload of the same content created the row first.
+                Blob.objects.filter(name=name).update(refs=F('refs') + 1, updated_at=now)
+
+    def delete(self, name):
+        if not is_blob_name(name):
+            return super().delete(name)
+        from .models import Blob
+
+        Blob.objects.filter(name=name, refs__gt=0).update(refs=F('refs') - 1, updated_at=timezone.now())
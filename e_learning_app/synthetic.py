@@ -0,0 +1,352 @@
+"""
+Reproducible synthetic data for benchmarks and load tests.
+
+Every row gets an explicit primary key (continuing from the current maximum)
+so related rows can be built without reading anything back, and all users
+share one precomputed password hash. Rows are written as plain tuples in
+BATCH_SIZE executemany() batches inside one transaction. That skips model
+instantiation and per-field preparation, which is most of bulk_create's
+cost at this volume, and keeps generated timestamps that auto_now_add would
+overwrite. No signals are sent, so the denormalized counters, the search
+index and the catalog version are rebuilt at the end.
+"""
+import bisect
+import datetime
+import random
+from contextlib import contextmanager
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from . import search
+from .catalog import invalidate_catalog
+from .models import (User, Course, Enrollment, Payment, Assignment, Submission, Feedback, Attendance, Blob,
+                     PlatformStats, COURSE_STAT_FIELDS)
+from .storage import ContentAddressedStorage, submission_storage
+
+TIERS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+PASSWORD = 'synthetic'
+BATCH_SIZE = 10_000
+COURSES_PER_STUDENT = 4
+STUDENTS_PER_COURSE = 500
+COURSES_PER_TRAINER = 5
+ASSIGNMENTS_PER_COURSE = 5
+ATTENDANCE_SESSIONS = 3
+# Course popularity follows a Zipf law: the n-th most popular course draws 1/n^s of the demand.
+POPULARITY_EXPONENT = 1.0
+
+SUBJECTS = ['Python', 'Django', 'SQL', 'Statistics', 'Networking', 'Design', 'Marketing', 'Accounting',
+            'Rust', 'Kubernetes', 'Photography', 'Spanish']
+LEVELS = ['Foundations of', 'Practical', 'Advanced', 'Applied', 'Modern']
+ENROLLMENT_STATUSES = {'active': 70, 'completed': 15, 'pending': 10, 'dropped': 5}
+PAYMENT_METHODS = {'upi': 40, 'credit_card': 25, 'debit_card': 20, 'net_banking': 10, 'cash': 5}
+RATINGS = {1: 5, 2: 8, 3: 17, 4: 35, 5: 35}
+# The file every synthetic submission points at: the smallest PDF readers accept.
+PLACEHOLDER_PDF = (b'%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n'
+                   b'2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\n'
+                   b'trailer<</Root 1 0 R>>\n%%EOF\n')
+
+# Page cache while loading, in KiB (negative means KiB to SQLite).
+BULK_CACHE_KIB = -256 * 1024
+
+DAY = 24 * 60 * 60
+WEEK = 7 * DAY
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class _Table:
+    """
+    Buffered executemany() inserts into ``fields`` of ``model``; rows are
+    tuples in field order. ``parent`` is flushed first so no batch ever
+    references rows that are still buffered: SQLite handles an outstanding
+    deferred foreign-key violation by searching the child table on every
+    later parent insert.
+    """
+
+    def __init__(self, model, fields, batch_size, parent=None):
+        self.parent = parent
+        self.batch_size = batch_size
+        self.next_id = _next_id(model)
+        self.rows = []
+        self.written = 0
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(model._meta.get_field(name).column) for name in ('id', *fields))
+        placeholders = ', '.join(['%s'] * (len(fields) + 1))
+        self.sql = f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+
+    def add(self, *values):
+        pk = self.next_id
+        self.next_id += 1
+        self.rows.append((pk, *values))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+        return pk
+
+    def flush(self):
+        if self.parent:
+            self.parent.flush()
+        if self.rows:
+            with connection.cursor() as cursor:
+                cursor.executemany(self.sql, self.rows)
+            self.written += len(self.rows)
+            self.rows = []
+
+
+@contextmanager
+def _bulk_load(models):
+    """
+    On SQLite, drop the indexes and triggers of ``models`` for the duration
+    of the load and recreate them afterwards. One sorted index build is much
+    cheaper than a random B-tree insert per row, and recreating a unique
+    index still rejects duplicates. The caller reindexes search afterwards,
+    since the search triggers do not fire while dropped. Must run inside a
+    transaction: if the load fails, the rollback brings the schema back.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        placeholders = ', '.join(['%s'] * len(tables))
+        cursor.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL "
+            f"AND tbl_name IN ({placeholders})", tables,
+        )
+        schema = cursor.fetchall()
+        cursor.execute('PRAGMA cache_size')
+        cache_size = cursor.fetchone()[0]
+        cursor.execute(f'PRAGMA cache_size = {BULK_CACHE_KIB:d}')
+        for kind, name, _ in schema:
+            cursor.execute(f'DROP {kind.upper()} {connection.ops.quote_name(name)}')
+        yield
+        for _, _, sql in schema:
+            cursor.execute(sql)
+        cursor.execute(f'PRAGMA cache_size = {cache_size:d}')
+
+
+class _Weighted:
+    """Repeated weighted choice over a fixed population."""
+
+    def __init__(self, rng, weights):
+        self.rng = rng
+        self.population = list(weights)
+        self.cumulative = list(accumulate(weights.values()))
+
+    def __call__(self):
+        return self.population[bisect.bisect(self.cumulative, self.rng.random() * self.cumulative[-1])]
+
+
+class Plan:
+    """Row counts, id ranges and course popularity for one generated dataset."""
+
+    def __init__(self, enrollments, rng):
+        self.enrollments = enrollments
+        self.students = max(1, enrollments // COURSES_PER_STUDENT)
+        self.courses = max(COURSES_PER_STUDENT * 2, enrollments // STUDENTS_PER_COURSE)
+        self.trainers = max(2, self.courses // COURSES_PER_TRAINER)
+        self.user_id = _next_id(User)
+        self.course_id = _next_id(Course)
+        self.assignment_id = _next_id(Assignment)
+
+        # Shuffle popularity so the busiest courses are not simply the first ids.
+        popularity = [1 / rank ** POPULARITY_EXPONENT for rank in range(1, self.courses + 1)]
+        rng.shuffle(popularity)
+        self.popularity = list(accumulate(popularity))
+
+    def trainer_id(self, index):
+        return self.user_id + 1 + index
+
+    def student_id(self, index):
+        return self.user_id + 1 + self.trainers + index
+
+    def course_trainer(self, course_index):
+        return self.trainer_id(course_index % self.trainers)
+
+    def pick_courses(self, rng, count):
+        """``count`` distinct course indexes, drawn by popularity."""
+        count = min(count, self.courses)
+        chosen = []
+        while len(chosen) < count:
+            index = bisect.bisect(self.popularity, rng.random() * self.popularity[-1])
+            if index not in chosen:
+                chosen.append(index)
+        return chosen
+
+
+def generate(enrollments, seed=0, batch_size=BATCH_SIZE, as_of=None):
+    """
+    Create a dataset with ``enrollments`` enrollments; returns rows written
+    per model. Timestamps fall before midnight (UTC) of ``as_of``, today by
+    default, so the same seed, size and date always give the same rows.
+    """
+    rng = random.Random(seed)
+    plan = Plan(enrollments, rng)
+    as_of = as_of or timezone.now().date()
+    now = int(datetime.datetime.combine(as_of, datetime.time.min, datetime.timezone.utc).timestamp())
+
+    with transaction.atomic():
+        placeholder = _placeholder(submission_storage())
+        with _bulk_load([User, Course, Assignment, Enrollment, Payment, Submission, Feedback, Attendance]):
+            counts = {'users': _users(plan, make_password(PASSWORD), now, batch_size)}
+            catalog_counts, fees, starts, due_dates = _catalog(plan, rng, now, batch_size)
+            counts.update(catalog_counts)
+            counts.update(_activity(plan, rng, fees, starts, due_dates, placeholder, now, batch_size))
+        if placeholder:
+            # save() took one reference; the rows written hold the rest.
+            Blob.objects.filter(name=placeholder).update(refs=F('refs') + counts['submissions'] - 1,
+                                                         updated_at=timezone.now())
+
+        PlatformStats.rebuild()
+        Course.objects.rebuild_stats()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                search.rebuild(cursor)
+    invalidate_catalog()
+    return counts
+
+
+def _placeholder(storage):
+    """
+    Save PLACEHOLDER_PDF and return its name, or '' to leave the files empty.
+    Only a ContentAddressedStorage counts references to a shared name; in any
+    other storage deleting one submission would remove every row's file.
+    """
+    if not isinstance(storage, ContentAddressedStorage):
+        return ''
+    return storage.save(f'{Submission.submission_file.field.upload_to}synthetic.pdf', ContentFile(PLACEHOLDER_PDF))
+
+
+def _at(seconds):
+    # Naive UTC, which is what the backends store for aware datetimes; much
+    # cheaper than building aware values and adapting each one.
+    return EPOCH + datetime.timedelta(seconds=seconds)
+
+
+def _users(plan, password, now, batch_size):
+    users = _Table(User, ['password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff',
+                          'is_active', 'date_joined', 'user_type', 'phone', 'address'], batch_size)
+    joined = _at(now)
+    users.add(password, False, f'synthetic_manager_{plan.user_id}', '', '', '', True, True, joined, 'manager', '', '')
+    for index in range(plan.trainers):
+        users.add(password, False, f'synthetic_trainer_{plan.trainer_id(index)}', 'Trainer', str(index), '', False,
+                  True, joined, 'trainer', '', '')
+    for index in range(plan.students):
+        users.add(password, False, f'synthetic_student_{plan.student_id(index)}', 'Student', str(index), '', False,
+                  True, joined, 'student', '', '')
+    users.flush()
+    return users.written
+
+
+def _catalog(plan, rng, now, batch_size):
+    """Courses and their assignments; returns each course's fee, start and assignment due dates."""
+    courses = _Table(Course, ['name', 'description', 'duration_weeks', 'difficulty_level', 'fee', 'trainer',
+                              'created_at', 'is_active', *COURSE_STAT_FIELDS], batch_size)
+    assignments = _Table(Assignment, ['course', 'title', 'description', 'due_date', 'max_marks', 'created_by',
+                                      'created_at'], batch_size)
+    fees, starts, due_dates = [], [], []
+    for index in range(plan.courses):
+        name = f'{rng.choice(LEVELS)} {rng.choice(SUBJECTS)} {index}'
+        fee = str(rng.randrange(500, 20000, 500))
+        start = now - rng.randint(30, 730) * DAY
+        trainer_id = plan.course_trainer(index)
+        course_id = courses.add(name, f'{name}: a synthetic course.', rng.randint(2, 16),
+                                rng.choice(['beginner', 'intermediate', 'advanced']), fee, trainer_id,
+                                _at(start), rng.random() < 0.9, *[0] * len(COURSE_STAT_FIELDS))
+        fees.append(fee)
+        starts.append(start)
+        for number in range(ASSIGNMENTS_PER_COURSE):
+            due = start + (number + 1) * 2 * WEEK
+            due_dates.append(due)
+            assignments.add(course_id, f'Assignment {number + 1}', 'Synthetic assignment.', _at(due),
+                            100, trainer_id, _at(start))
+    courses.flush()
+    assignments.flush()
+    return {'courses': courses.written, 'assignments': assignments.written}, fees, starts, due_dates
+
+
+def _activity(plan, rng, fees, starts, due_dates, placeholder, now, batch_size):
+    """Enrollments and everything hanging off them, in a single pass."""
+    enrollments = _Table(Enrollment, ['student', 'course', 'enrollment_date', 'status', 'progress_percentage'],
+                         batch_size)
+    tables = {
+        'enrollments': enrollments,
+        'payments': _Table(Payment, ['enrollment', 'amount', 'payment_date', 'payment_method', 'transaction_id',
+                                     'status', 'notes', 'idempotency_key'], batch_size, parent=enrollments),
+        'submissions': _Table(Submission, ['assignment', 'student', 'submission_file', 'submission_text',
+                                           'submitted_at', 'marks_obtained', 'feedback', 'graded_by', 'graded_at'],
+                              batch_size),
+        'feedbacks': _Table(Feedback, ['student', 'course', 'rating', 'comment', 'created_at'], batch_size),
+        'attendance': _Table(Attendance, ['enrollment', 'date', 'status', 'notes', 'marked_by'], batch_size,
+                             parent=enrollments),
+    }
+    payments, submissions = tables['payments'], tables['submissions']
+    feedbacks, attendance = tables['feedbacks'], tables['attendance']
+    roll = rng.random
+    status_of = _Weighted(rng, ENROLLMENT_STATUSES)
+    method_of = _Weighted(rng, PAYMENT_METHODS)
+    rating_of = _Weighted(rng, RATINGS)
+
+    for index in range(plan.students):
+        student_id = plan.student_id(index)
+        per_student = plan.enrollments // plan.students + (index < plan.enrollments % plan.students)
+        for course_index in plan.pick_courses(rng, per_student):
+            course_id = plan.course_id + course_index
+            trainer_id = plan.course_trainer(course_index)
+            status = status_of()
+            start = starts[course_index]
+            enrolled = start + int(roll() * (now - DAY - start))
+            progress = 100 if status == 'completed' else 0 if status == 'pending' else int(roll() * 96)
+            enrollment_id = enrollments.add(student_id, course_id, _at(enrolled), status, progress)
+            if status == 'pending':
+                continue
+
+            # A few payments fail before one goes through; dropped enrollments were refunded.
+            paid = enrolled + 60 + int(roll() * 3 * DAY)
+            while roll() < 0.05:
+                payments.add(enrollment_id, fees[course_index], _at(paid), method_of(), f'SYN{payments.next_id}',
+                             'failed', '', '')
+                paid += 60 + int(roll() * DAY)
+            payments.add(enrollment_id, fees[course_index], _at(paid), method_of(), f'SYN{payments.next_id}',
+                         'refunded' if status == 'dropped' else 'completed', '', '')
+
+            if roll() < 0.3:
+                feedbacks.add(student_id, course_id, rating_of(), 'Synthetic feedback.',
+                              _at(min(now, enrolled + (7 + int(roll() * 54)) * DAY)))
+
+            if status == 'dropped':
+                continue
+            # Most work lands a day or two before the deadline; about one in six is late.
+            diligence = 0.95 if status == 'completed' else 0.25
+            first_assignment = course_index * ASSIGNMENTS_PER_COURSE
+            for offset in range(ASSIGNMENTS_PER_COURSE):
+                if roll() >= diligence:
+                    continue
+                submitted = due_dates[first_assignment + offset] + int(rng.gauss(-2, 2) * DAY)
+                graded = submitted + (1 + int(roll() * 7)) * DAY
+                if graded < now:
+                    marks, graded_by, graded_at = int(rng.triangular(30, 100, 78)), trainer_id, _at(graded)
+                else:
+                    marks, graded_by, graded_at = None, None, None
+                submissions.add(plan.assignment_id + first_assignment + offset, student_id,
+                                placeholder, '', _at(submitted), marks, '', graded_by, graded_at)
+
+            # Weekly sessions; presence and absence both come in streaks.
+            session = _at(enrolled).date()
+            present = True
+            for _ in range(ATTENDANCE_SESSIONS):
+                present = roll() < (0.9 if present else 0.4)
+                mark = ('late' if roll() < 0.08 else 'present') if present else 'absent'
+                attendance.add(enrollment_id, session, mark, '', trainer_id)
+                session += datetime.timedelta(weeks=1)
+
+    for table in tables.values():
+        table.flush()
+    return {name: table.written for name, table in tables.items()}
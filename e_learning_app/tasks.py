@@ -0,0 +1,140 @@
+"""
+Database-backed background tasks.
+
+Decorate a module-level function with @task, then call ``func.delay(...)``
+to queue it. The row is written in the caller's transaction, so the task
+only becomes visible to workers if the surrounding writes commit, and it is
+never lost after they do. ``func.delay_on_commit(...)`` queues it only once
+the transaction has committed, for work that must not share its fate.
+Arguments must be JSON-serializable, so pass ids rather than model instances.
+
+`manage.py run_tasks` claims due tasks in batches and runs them on a thread
+or process pool. A failed task is retried with exponential backoff up to
+``max_attempts``; a task whose worker died is requeued once its claim is
+older than the visibility timeout.
+"""
+import datetime
+import functools
+import logging
+import random
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task_settings():
+    config = {
+        'MAX_ATTEMPTS': 5,
+        # Retry n waits BACKOFF_BASE * 2**(n - 1) seconds (with jitter), at most BACKOFF_MAX.
+        'BACKOFF_BASE': 5,
+        'BACKOFF_MAX': 60 * 60,
+        # A claim older than this is assumed to belong to a dead worker.
+        'VISIBILITY_TIMEOUT': 10 * 60,
+        'KEEP_DONE_HOURS': 24,
+    }
+    config.update(getattr(settings, 'TASKS', {}))
+    return config
+
+
+def task(func=None, *, max_attempts=None):
+    """Register ``func`` as a task and give it ``delay`` and ``delay_on_commit``."""
+    if func is None:
+        return functools.partial(task, max_attempts=max_attempts)
+
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    def delay(*args, run_at=None, **kwargs):
+        return Task.objects.create(
+            name=name, args=list(args), kwargs=kwargs, run_at=run_at or timezone.now(),
+            max_attempts=max_attempts or task_settings()['MAX_ATTEMPTS'],
+        )
+
+    def delay_on_commit(*args, **kwargs):
+        transaction.on_commit(lambda: delay(*args, **kwargs))
+
+    func.task_name = name
+    func.delay = delay
+    func.delay_on_commit = delay_on_commit
+    return func
+
+
+def claim(batch_size, now=None):
+    """
+    Mark up to ``batch_size`` due tasks as running under a fresh claim id and
+    return them. Backends with SKIP LOCKED select and update inside one
+    transaction. Elsewhere (SQLite) a single UPDATE ... WHERE id IN
+    (SELECT ... LIMIT n) does it in one statement, which SQLite runs under
+    its write lock, so two workers can never claim the same task.
+    """
+    now = now or timezone.now()
+    claim_id = uuid.uuid4().hex
+    due = Task.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id')
+    updates = dict(status='running', claimed_by=claim_id, claimed_at=now, attempts=F('attempts') + 1)
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size])
+            Task.objects.filter(id__in=ids).update(**updates)
+    else:
+        Task.objects.filter(id__in=due.values('id')[:batch_size], status='queued').update(**updates)
+    return list(Task.objects.filter(status='running', claimed_by=claim_id).order_by('run_at', 'id'))
+
+
+def execute(name, args, kwargs):
+    """Run one task in this thread or process; returns None or a formatted traceback."""
+    close_old_connections()
+    try:
+        import_string(name)(*args, **kwargs)
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        close_old_connections()
+    return None
+
+
+def finish(task_row, error, now=None):
+    """Record the outcome of one attempt: done, queued again with backoff, or failed."""
+    now = now or timezone.now()
+    running = Task.objects.filter(pk=task_row.pk, status='running', claimed_by=task_row.claimed_by)
+    if error is None:
+        return running.update(status='done', finished_at=now, claimed_by='', last_error='')
+    if task_row.attempts >= task_row.max_attempts:
+        logger.error('Task %s (%s) failed for good after %d attempts:\n%s',
+                     task_row.pk, task_row.name, task_row.attempts, error)
+        return running.update(status='failed', finished_at=now, claimed_by='', last_error=error)
+    config = task_settings()
+    delay = min(config['BACKOFF_BASE'] * 2 ** (task_row.attempts - 1), config['BACKOFF_MAX'])
+    delay *= random.uniform(0.5, 1.0)
+    logger.warning('Task %s (%s) attempt %d failed; retrying in %.0fs',
+                   task_row.pk, task_row.name, task_row.attempts, delay)
+    return running.update(status='queued', run_at=now + datetime.timedelta(seconds=delay),
+                          claimed_by='', last_error=error)
+
+
+def requeue_stale(now=None):
+    """
+    Put tasks whose worker stopped answering back in the queue. The lost
+    attempt still counts, so a task that keeps killing its worker ends up
+    failed instead of looping.
+    """
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(seconds=task_settings()['VISIBILITY_TIMEOUT'])
+    stale = Task.objects.filter(status='running', claimed_at__lt=cutoff)
+    error = 'Claim expired; the worker stopped before finishing.'
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, claimed_by='', last_error=error)
+    return stale.update(status='queued', run_at=now, claimed_by='', last_error=error)
+
+
+def purge_done(now=None):
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(hours=task_settings()['KEEP_DONE_HOURS'])
+    return Task.objects.filter(status='done', finished_at__lt=cutoff).delete()[0]
@@ -0,0 +1,39 @@
+import zlib
+
+from django import template
+from django.urls import reverse
+from django.utils.html import format_html
+
+from e_learning_app.thumbnails import pick_size, thumbnail_settings
+
+register = template.Library()
+
+MIME_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+
+@register.simple_tag
+def avatar(user, size=32, css_class='rounded-circle'):
+    """
+    ``<picture>`` for ``user``'s profile picture at ``size`` CSS pixels, using
+    the smallest variant that covers it (and at twice that for 2x screens).
+    The last configured format is the ``<img>`` fallback. Renders nothing
+    for users without a picture, and never queries the database or storage.
+    """
+    if not user.profile_picture:
+        return ''
+    # Changes whenever a new picture is uploaded, so cached variants are bypassed.
+    version = format(zlib.crc32(user.profile_picture.name.encode()), 'x')
+
+    def url(pixels, fmt):
+        path = reverse('profile_thumbnail', args=[user.id, pick_size(pixels), fmt])
+        return f'{path}?v={version}'
+
+    formats = thumbnail_settings()['FORMATS']
+    sources = format_html(''.join(
+        format_html('<source type="{}" srcset="{} 1x, {} 2x">', MIME_TYPES[fmt], url(size, fmt), url(size * 2, fmt))
+        for fmt in formats[:-1]
+    ))
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{} 2x" width="{}" height="{}" class="{}" alt="{}" loading="lazy"></picture>',
+        sources, url(size, formats[-1]), url(size * 2, formats[-1]), size, size, css_class, user.username,
+    )
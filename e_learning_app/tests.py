@@ -1,3 +1,960 @@
-from django.test import TestCase
+import csv
+import datetime
+import hashlib
+import io
+import os
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.sessions.models import Session
+from django.db import IntegrityError, OperationalError, transaction
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import replica, synthetic, tasks
+from .auth import PRINCIPAL_CACHE
+from .catalog import active_catalog, catalog_version
+from .forms import GradeUploadForm
+from .management.commands.enrollment_race import Command as EnrollmentRace
+from .middleware import QueryBudgetExceeded, fingerprint
+from .models import (User, Course, Enrollment, Assignment, Submission, Feedback, PlatformStats, Attendance, Blob,
+                     ChunkedUpload, Payment, Task, COURSE_STAT_FIELDS)
+from .pagination import paginate_keyset
+from .search import search as search_index
+from .storage import is_blob_name, submission_storage
+from .tasks import task
+from .thumbnails import generate
+from .uploads import chunked_upload_settings
+
+# settings.py points the catalog and auth caches at files under BASE_DIR/cache,
+# shared with the dev server and with earlier test runs. Tests get private
+# in-memory caches, emptied before every test.
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{alias}'}
+    for alias in ('default', 'catalog', 'auth')
+}
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AppTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
+
+
+def create_user(username, user_type, **fields):
+    return User.objects.create_user(username, password='pass', user_type=user_type, **fields)
+
+
+def create_course(trainer, **fields):
+    fields = {'name': 'Python Basics', 'description': 'Intro', 'duration_weeks': 4,
+              'difficulty_level': 'beginner', 'fee': 500, **fields}
+    return Course.objects.create(trainer=trainer, **fields)
+
+
+def create_assignment(course, **fields):
+    fields = {'title': 'Homework 1', 'description': 'Solve it', 'max_marks': 100,
+              'due_date': timezone.now() + datetime.timedelta(days=7), **fields}
+    return Assignment.objects.create(course=course, created_by=course.trainer, **fields)
+
+
+# ============= QUERY BUDGETS =============
+class QueryBudgetTests(AppTestCase):
+    def test_fingerprint_groups_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 42 AND name = 'o''brien' AND pk IN (%s, %s, %s)"),
+            'SELECT * FROM t WHERE id = %s AND name = %s AND pk IN (...)',
+        )
+
+    @override_settings(QUERY_BUDGET={'ENABLED': True, 'VIEWS': {'home': 50}})
+    def test_response_reports_query_count(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Query-Count', response)
+        self.assertIn('X-DB-Time-ms', response)
+
+    @override_settings(QUERY_BUDGET={'ENABLED': True, 'ENFORCE': True, 'VIEWS': {'home': 0}})
+    def test_enforced_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('home'))
+
+    @override_settings(QUERY_BUDGET={'ENABLED': False})
+    def test_disabled_adds_no_headers(self):
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('X-Query-Count', response)
+
+
+# ============= LOADING PROFILES =============
+class LoadingProfileTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.trainer = create_user('trainer', 'trainer')
+        self.student = create_user('student', 'student')
+        self.course = create_course(self.trainer)
+        self.assignment = create_assignment(self.course)
+        Enrollment.objects.create(student=self.student, course=self.course, status='active')
+
+    def test_submit_page_loads_the_course_with_the_assignment(self):
+        self.client.force_login(self.student)
+        url = reverse('student_submit_assignment', args=[self.assignment.id])
+        self.client.get(url)
+        # The assignment with its course, then the already-submitted check.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(response, self.course.name)
+
+    def test_bulk_grade_queries_do_not_grow_with_submissions(self):
+        for i in range(5):
+            student = create_user(f'student{i}', 'student')
+            Submission.objects.create(assignment=self.assignment, student=student, submission_file='a.txt')
+        self.client.force_login(self.trainer)
+        url = reverse('trainer_bulk_grade', args=[self.assignment.id])
+        self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(response, 'student4')
+
+
+# ============= KEYSET PAGINATION =============
+class KeysetPaginationTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        course = create_course(create_user('trainer', 'trainer'))
+        start = timezone.now()
+        for i in range(7):
+            enrollment = Enrollment.objects.create(student=create_user(f'student{i}', 'student'), course=course)
+            # Pairs of equal dates, so pages split ties on the key.
+            Enrollment.objects.filter(pk=enrollment.pk).update(enrollment_date=start - datetime.timedelta(days=i // 2))
+        self.expected = list(Enrollment.objects.order_by('-enrollment_date', '-id').values_list('id', flat=True))
+        self.factory = RequestFactory()
+
+    def page(self, **params):
+        return paginate_keyset(Enrollment.objects.all(), self.factory.get('/', params), '-enrollment_date', per_page=3)
+
+    def test_walks_forward_and_back_without_gaps_or_repeats(self):
+        pages = [self.page()]
+        while pages[-1].has_next:
+            pages.append(self.page(after=pages[-1].next_cursor))
+        self.assertEqual([row.id for page in pages for row in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous)
+
+        back = self.page(before=pages[-1].prev_cursor)
+        self.assertEqual([row.id for row in back], self.expected[3:6])
+        self.assertTrue(back.has_previous)
+        self.assertTrue(back.has_next)
+
+    def test_links_keep_other_parameters(self):
+        request = self.factory.get('/', {'status': 'active'})
+        page = paginate_keyset(Enrollment.objects.all(), request, '-enrollment_date', per_page=3)
+        query = QueryDict(page.next_querystring())
+        self.assertEqual(query['status'], 'active')
+        self.assertEqual(query['after'], page.next_cursor)
+
+    def test_malformed_cursor_starts_from_the_first_page(self):
+        self.assertEqual([row.id for row in self.page(after='not-a-cursor')], self.expected[:3])
+
+
+# ============= PLATFORM COUNTERS =============
+class PlatformStatsTests(AppTestCase):
+    def stats(self):
+        return PlatformStats.objects.values(*PlatformStats.compute()).get(pk=1)
+
+    def test_counters_follow_users_courses_and_enrollments(self):
+        PlatformStats.rebuild()
+        trainer = create_user('trainer', 'trainer')
+        student = create_user('student', 'student')
+        course = create_course(trainer)
+        enrollment = Enrollment.objects.create(student=student, course=course)
+        self.assertEqual(self.stats(), {'total_students': 1, 'total_trainers': 1, 'total_courses': 1,
+                                        'total_enrollments': 0})
+
+        enrollment.status = 'active'
+        enrollment.save(update_fields=['status'])
+        student.user_type = 'trainer'
+        student.save()
+        self.assertEqual(self.stats(), {'total_students': 0, 'total_trainers': 2, 'total_courses': 1,
+                                        'total_enrollments': 1})
+
+        course.delete()
+        self.assertEqual(self.stats(), PlatformStats.compute())
+        self.assertEqual(self.stats()['total_courses'], 0)
+
+    def test_recount_reports_and_repairs_drift(self):
+        create_user('student', 'student')
+        PlatformStats.rebuild()
+        call_command('recount', check=True, stdout=io.StringIO())
+
+        PlatformStats.objects.filter(pk=1).update(total_students=7)
+        with self.assertRaisesMessage(CommandError, 'total_students'):
+            call_command('recount', check=True, stdout=io.StringIO())
+        call_command('recount', stdout=io.StringIO())
+        self.assertEqual(self.stats()['total_students'], 1)
+
+
+# ============= COURSE STATS =============
+class CourseStatsTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = create_course(create_user('trainer', 'trainer'))
+
+    def stats(self):
+        return Course.objects.values(*COURSE_STAT_FIELDS).get(pk=self.course.pk)
+
+    def test_stats_follow_enrollments_and_feedback(self):
+        first = Enrollment.objects.create(student=create_user('student1', 'student'), course=self.course,
+                                          status='active', progress_percentage=40)
+        second = Enrollment.objects.create(student=create_user('student2', 'student'), course=self.course,
+                                           progress_percentage=90)
+        Feedback.objects.create(student=first.student, course=self.course, rating=4, comment='Good')
+        Feedback.objects.create(student=second.student, course=self.course, rating=1, comment='Bad')
+        # The pending enrollment counts towards neither the roster nor the average.
+        self.assertEqual(self.stats(), {'active_enrollment_count': 1, 'progress_sum': 40,
+                                        'rating_sum': 5, 'rating_count': 2})
+
+        second.status = 'active'
+        second.save()
+        first.progress_percentage = 60
+        first.save(update_fields=['progress_percentage'])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.avg_progress, 75)
+        self.assertEqual(self.course.avg_rating, 2.5)
+
+        first.delete()
+        Feedback.objects.filter(student=first.student).delete()
+        self.assertEqual(self.stats(), {'active_enrollment_count': 1, 'progress_sum': 90,
+                                        'rating_sum': 1, 'rating_count': 1})
+
+    def test_moving_an_enrollment_moves_its_contribution(self):
+        other = create_course(self.course.trainer, name='Django')
+        enrollment = Enrollment.objects.create(student=create_user('student', 'student'), course=self.course,
+                                               status='active', progress_percentage=30)
+        enrollment.course = other
+        enrollment.save()
+        self.assertEqual(self.stats()['active_enrollment_count'], 0)
+        self.assertEqual(Course.objects.get(pk=other.pk).progress_sum, 30)
+
+    def test_recount_repairs_course_stats(self):
+        Enrollment.objects.create(student=create_user('student', 'student'), course=self.course, status='active')
+        Course.objects.filter(pk=self.course.pk).update(active_enrollment_count=9)
+        with self.assertRaisesMessage(CommandError, f'course {self.course.pk}.active_enrollment_count'):
+            call_command('recount', check=True, stdout=io.StringIO())
+        call_command('recount', stdout=io.StringIO())
+        self.assertEqual(self.stats()['active_enrollment_count'], 1)
+
+
+# ============= COURSE CATALOG =============
+class CatalogTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.trainer = create_user('trainer', 'trainer')
+        self.course = create_course(self.trainer)
+
+    def test_second_home_hit_reads_the_cached_catalog(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Python Basics')
+
+    def test_course_writes_invalidate_after_commit(self):
+        version = active_catalog().version
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.course.name = 'Python Advanced'
+            self.course.save()
+            self.assertEqual(catalog_version(), version)
+        for callback in callbacks:
+            callback()
+        catalog = active_catalog()
+        self.assertGreater(catalog.version, version)
+        self.assertEqual([course.name for course in catalog.courses], ['Python Advanced'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.delete()
+        self.assertEqual(active_catalog().courses, [])
+
+    def test_dashboard_subtracts_enrollments_from_the_cached_catalog(self):
+        other = create_course(self.trainer, name='Django')
+        student = create_user('student', 'student')
+        Enrollment.objects.create(student=student, course=self.course, status='active')
+        self.client.force_login(student)
+        self.client.get(reverse('student_dashboard'))
+        # Only the student's enrollments; no exclude(id__in=...) over courses.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.context['available_courses'], [other])
+
+
+# ============= ROSTER ATTENDANCE =============
+class RosterAttendanceTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.trainer = create_user('trainer', 'trainer')
+        self.course = create_course(self.trainer)
+        self.client.force_login(self.trainer)
+        self.url = reverse('trainer_roster_attendance') + f'?course={self.course.id}&date=2026-03-02'
+        # Load the session and the trainer into the cache.
+        self.client.get(self.url)
+
+    def enroll(self, count):
+        start = Enrollment.objects.count()
+        for i in range(start, start + count):
+            Enrollment.objects.create(student=create_user(f'student{i}', 'student'), course=self.course,
+                                      status='active')
+        return list(Enrollment.objects.values_list('id', flat=True))
+
+    def mark(self, enrollment_ids, status):
+        # The course, the roster, and one upsert (wrapped in a savepoint
+        # inside the test's transaction), however many students there are.
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, {f'status_{pk}': status for pk in enrollment_ids})
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+
+    def test_marks_the_whole_roster_in_a_fixed_number_of_queries(self):
+        # N students, then 2N.
+        for count in (3, 3):
+            enrollment_ids = self.enroll(count)
+            self.mark(enrollment_ids, 'present')
+            # Changing the day's status updates the rows in place.
+            self.mark(enrollment_ids, 'late')
+            self.assertEqual(Attendance.objects.count(), len(enrollment_ids))
+            self.assertEqual(set(Attendance.objects.values_list('status', flat=True)), {'late'})
+
+    def test_shows_the_statuses_already_marked(self):
+        enrollment_id = self.enroll(1)[0]
+        self.mark([enrollment_id], 'absent')
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['roster_form'][f'status_{enrollment_id}'].value(), 'absent')
+
+
+# ============= GRADE UPLOADS =============
+class GradeUploadTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        assignment = create_assignment(create_course(create_user('trainer', 'trainer')))
+        self.submission = Submission.objects.create(assignment=assignment, student=create_user('zoe', 'student'),
+                                                    submission_file='a.txt')
+
+    def form(self, content):
+        upload = SimpleUploadedFile('grades.csv', content, content_type='text/csv')
+        return GradeUploadForm({}, {'grades_file': upload}, submissions=[self.submission], max_marks=100)
+
+    def test_reads_utf8_with_byte_order_mark(self):
+        form = self.form('username,marks,feedback\nzoe,80,Très bien\n'.encode('utf-8-sig'))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.grades, {self.submission.id: (80, 'Très bien')})
+
+    def test_rejects_other_encodings(self):
+        # As saved by Excel on Windows.
+        form = self.form('username,marks,feedback\nzoe,80,Très bien\n'.encode('cp1252'))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['grades_file'], ['The CSV must be saved as UTF-8.'])
+
+    def test_rejects_malformed_csv(self):
+        form = self.form(b'username,marks,feedback\nzoe,80,' + b'x' * (csv.field_size_limit() + 1) + b'\n')
+        self.assertFalse(form.is_valid())
+        self.assertIn('could not be read as CSV', form.errors['grades_file'][0])
+
+
+# ============= EXPORTS =============
+class ExportTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = create_user('manager', 'manager')
+        course = create_course(create_user('trainer', 'trainer'))
+        for i in range(3):
+            Enrollment.objects.create(student=create_user(f'student{i}', 'student'), course=course, status='active')
+        self.url = reverse('manager_export', args=['enrollments']) + '?format=csv'
+
+    def test_streams_csv_under_wsgi(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(self.url)
+        self.assertFalse(response.is_async)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,student_username,course_name,status,progress_percentage,enrollment_date')
+        self.assertEqual(len(lines), 4)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.manager)
+        response = await self.async_client.get(self.url)
+        # A sync iterator would be buffered whole by the ASGI handler.
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn(',student2,Python Basics,active,', lines[3])
+
+
+# ============= ASYNC VIEWS =============
+class AsyncViewTests(AppTestCase):
+    async def test_dashboard_renders_with_the_resolved_user(self):
+        student = await sync_to_async(create_user)('student', 'student')
+        await self.async_client.aforce_login(student)
+        response = await self.async_client.get(reverse('student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        # Not the lazy object: the template reused the user role_required loaded.
+        self.assertIs(type(response.asgi_request.user), User)
+        self.assertContains(response, 'student')
+
+    async def test_other_roles_are_sent_home(self):
+        await self.async_client.aforce_login(await sync_to_async(create_user)('trainer', 'trainer'))
+        response = await self.async_client.get(reverse('manager_analyse_progress'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+
+# ============= SEARCH =============
+class SearchTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        trainer = create_user('trainer', 'trainer')
+        self.python = create_course(trainer, name='Python Basics', description='Variables and loops')
+        self.django = create_course(trainer, name='Django', description='Web apps in Python', is_active=False)
+        create_course(trainer, name='Rust', description='Ownership')
+
+    def test_ranks_title_matches_first_and_highlights_them(self):
+        results = search_index('pyth', include_inactive=True)
+        self.assertEqual([result['object_id'] for result in results], [self.python.id, self.django.id])
+        self.assertEqual(results[0]['title'], '<mark>Python</mark> Basics')
+
+    def test_admin_search_filters_with_the_index(self):
+        admin = create_user('admin', 'manager', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:e_learning_app_course_changelist'), {'q': 'python'})
+        self.assertEqual({course.id for course in response.context['cl'].result_list},
+                         {self.python.id, self.django.id})
+        response = self.client.get(reverse('admin:e_learning_app_course_changelist'), {'q': '!!'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+
+# ============= SUBMISSION STORAGE =============
+class BlobStorageTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(self.settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.assignment = create_assignment(create_course(create_user('trainer', 'trainer')))
+
+    def submit(self, username, content=b'print("hello")', filename='answer.py'):
+        submission = Submission(assignment=self.assignment, student=create_user(username, 'student'))
+        with transaction.atomic():
+            submission.submission_file.save(filename, ContentFile(content), save=False)
+            submission.save()
+        return submission
+
+    def test_identical_uploads_share_one_blob(self):
+        first, second = self.submit('alice'), self.submit('bob')
+        name = first.submission_file.name
+        self.assertEqual(name, second.submission_file.name)
+        self.assertRegex(name, r'^submissions/[0-9a-f]{2}/[0-9a-f]{64}\.py$')
+        self.assertEqual(Blob.objects.get(name=name).refs, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(Blob.objects.get(name=name).refs, 1)
+        self.assertTrue(second.submission_file.storage.exists(name))
+
+    def test_unusual_extensions_still_name_a_blob(self):
+        first = self.submit('alice', filename='report_v1.0-final')
+        second = self.submit('bob', filename='report_v1.0-final')
+        name = first.submission_file.name
+        self.assertTrue(is_blob_name(name))
+        self.assertNotIn('.', os.path.basename(name))
+
+        # Deleting one submission must not unlink the file the other still uses.
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        with second.submission_file.open('rb') as fh:
+            self.assertEqual(fh.read(), b'print("hello")')
+
+    def test_refused_row_rolls_back_its_reference(self):
+        submission = self.submit('alice')
+        duplicate = Submission(assignment=self.assignment, student=submission.student)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            duplicate.submission_file.save('copy.py', ContentFile(b'print("hello")'), save=False)
+            duplicate.save()
+        self.assertEqual(Blob.objects.get(name=submission.submission_file.name).refs, 1)
+
+    def test_gc_blobs_sweeps_unreferenced_blobs_and_repairs_counts(self):
+        kept, dropped = self.submit('alice'), self.submit('bob', content=b'other')
+        storage = kept.submission_file.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            dropped.delete()
+        Blob.objects.filter(name=kept.submission_file.name).update(refs=5)
+
+        call_command('gc_blobs', recount=True, min_age=0, stdout=io.StringIO())
+        self.assertEqual(Blob.objects.get(name=kept.submission_file.name).refs, 1)
+        self.assertFalse(Blob.objects.filter(name=dropped.submission_file.name).exists())
+        self.assertFalse(storage.exists(dropped.submission_file.name))
+        self.assertTrue(storage.exists(kept.submission_file.name))
+
+
+    def test_synthetic_submissions_reference_one_counted_blob(self):
+        counts = synthetic.generate(200, as_of=datetime.date(2026, 3, 1))
+        names = set(Submission.objects.values_list('submission_file', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_blob_name(name))
+        self.assertEqual(Blob.objects.get(name=name).refs, counts['submissions'])
+
+        # The counts hold up to a recount, so regrading or deleting one row keeps the file.
+        call_command('gc_blobs', recount=True, min_age=0, stdout=io.StringIO())
+        self.assertEqual(Blob.objects.get(name=name).refs, counts['submissions'])
+        self.assertTrue(submission_storage().exists(name))
+
+
+# ============= CHUNKED UPLOADS =============
+class ChunkedUploadTests(AppTestCase):
+    CONTENT = b'0123456789'
+
+    def setUp(self):
+        super().setUp()
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=os.path.join(root, 'media'), CHUNKED_UPLOADS={
+            'DIR': os.path.join(root, 'uploads'), 'CHUNK_SIZE': 4}))
+        self.assignment = create_assignment(create_course(create_user('trainer', 'trainer')))
+        self.student = create_user('student', 'student')
+        self.client.force_login(self.student)
+
+    def start(self, sha256=None):
+        data = {'filename': 'answer.txt', 'size': len(self.CONTENT)}
+        if sha256:
+            data['sha256'] = sha256
+        return self.client.post(reverse('student_start_upload', args=[self.assignment.id]), data)
+
+    def put(self, upload, start, end, sha256=None):
+        headers = {'Content-Range': f'bytes {start}-{end - 1}/{len(self.CONTENT)}'}
+        if sha256:
+            headers['X-Chunk-SHA256'] = sha256
+        return self.client.put(upload['url'], self.CONTENT[start:end], content_type='application/octet-stream',
+                               headers=headers)
+
+    def test_resumes_and_assembles_the_submission(self):
+        response = self.start(hashlib.sha256(self.CONTENT).hexdigest())
+        self.assertEqual(response.status_code, 201)
+        upload = response.json()
+        self.assertEqual(self.put(upload, 0, 4).json()['offset'], 4)
+
+        # Starting the same file again resumes the upload.
+        resumed = self.start(hashlib.sha256(self.CONTENT).hexdigest())
+        self.assertEqual(resumed.status_code, 200)
+        self.assertEqual((resumed.json()['id'], resumed.json()['offset']), (upload['id'], 4))
+
+        self.assertEqual(self.put(upload, 0, 4).json()['offset'], 4)  # a retried chunk is acknowledged
+        self.assertEqual(self.put(upload, 8, 10).status_code, 409)   # a gap is refused
+        self.put(upload, 4, 8)
+        self.assertEqual(self.put(upload, 8, 10).json()['offset'], 10)
+
+        response = self.client.post(upload['finalize_url'])
+        self.assertEqual(response.status_code, 201)
+        submission = Submission.objects.get(student=self.student)
+        with submission.submission_file.open('rb') as fh:
+            self.assertEqual(fh.read(), self.CONTENT)
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertFalse(os.listdir(chunked_upload_settings()['DIR']))
+
+    def test_rejects_a_chunk_that_fails_its_checksum(self):
+        upload = self.start().json()
+        response = self.put(upload, 0, 4, sha256=hashlib.sha256(b'nope').hexdigest())
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['offset'], 0)
+        self.assertEqual(ChunkedUpload.objects.get().offset, 0)
+
+        response = self.put(upload, 0, 4, sha256=hashlib.sha256(self.CONTENT[:4]).hexdigest())
+        self.assertEqual(response.json()['offset'], 4)
+
+    def test_restarts_an_assembled_file_that_fails_its_checksum(self):
+        upload = self.start(hashlib.sha256(b'something else').hexdigest()).json()
+        for start in range(0, len(self.CONTENT), 4):
+            self.put(upload, start, min(start + 4, len(self.CONTENT)))
+        response = self.client.post(upload['finalize_url'])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['offset'], 0)
+        self.assertFalse(Submission.objects.exists())
+
+
+# ============= PROTECTED MEDIA =============
+class ProtectedMediaTests(AppTestCase):
+    CONTENT = b'0123456789' * 10
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(self.settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        assignment = create_assignment(create_course(create_user('trainer', 'trainer')))
+        self.student = create_user('student', 'student')
+        self.submission = Submission(assignment=assignment, student=self.student)
+        self.submission.submission_file.save('answer.txt', ContentFile(self.CONTENT))
+        self.url = reverse('download_submission', args=[self.submission.id])
+        self.etag = f'"{hashlib.sha256(self.CONTENT).hexdigest()}"'
+        self.client.force_login(self.student)
+
+    def test_serves_the_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('filename="student-homework-1.txt"', response['Content-Disposition'])
+
+    def test_conditional_get_is_answered_without_a_body(self):
+        response = self.client.get(self.url, headers={'If-None-Match': self.etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_serves_single_byte_ranges(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[10:20])
+
+        response = self.client.get(self.url, headers={'Range': 'bytes=-5'})
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[-5:])
+        response = self.client.get(self.url, headers={'Range': 'bytes=500-'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=10-19', 'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+
+    @override_settings(PROTECTED_MEDIA={'SERVER': 'x-accel-redirect'})
+    def test_hands_the_transfer_to_the_front_server(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response['X-Accel-Redirect'].startswith('/protected-media/submissions/'))
+        self.assertEqual(response.content, b'')
+
+    def test_other_students_are_refused(self):
+        self.client.force_login(create_user('other', 'student'))
+        self.assertRedirects(self.client.get(self.url), reverse('home'), fetch_redirect_response=False)
+
+    def test_missing_file_is_not_found_for_its_owner(self):
+        storage = self.submission.submission_file.storage
+        storage.delete(self.submission.submission_file.name)
+        os.remove(storage.path(self.submission.submission_file.name))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        Submission.objects.filter(pk=self.submission.pk).update(submission_file='')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(self.url, headers={'Range': 'bytes=90-'})
+        self.assertTrue(response.is_async)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), self.CONTENT[90:])
+
+
+# ============= PROFILE THUMBNAILS =============
+class ProfileThumbnailTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(self.settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        image = io.BytesIO()
+        Image.new('RGB', (300, 200), 'navy').save(image, 'PNG')
+        self.user = create_user('student', 'student')
+        self.user.profile_picture.save('me.png', ContentFile(image.getvalue()))
+        self.url = reverse('profile_thumbnail', args=[self.user.id, 64, 'webp'])
+        self.client.force_login(self.user)
+
+    def test_original_stands_in_uncached_until_the_variant_exists(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('max-age=0', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+
+        generate(self.user.profile_picture.name)
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertNotIn('no-cache', response['Cache-Control'])
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as thumbnail:
+            self.assertEqual(thumbnail.size, (64, 64))
+
+    def test_unknown_sizes_are_not_found(self):
+        response = self.client.get(reverse('profile_thumbnail', args=[self.user.id, 65, 'webp']))
+        self.assertEqual(response.status_code, 404)
+
+
+# ============= BACKGROUND TASKS =============
+CALLS = []
+
+
+@task(max_attempts=2)
+def record_call(value):
+    CALLS.append(value)
+    if value == 'fail':
+        raise ValueError('boom')
+
+
+@override_settings(TASKS={'BACKOFF_BASE': 10, 'BACKOFF_MAX': 30, 'VISIBILITY_TIMEOUT': 60})
+class TaskQueueTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        CALLS.clear()
+        # Just ahead of the tasks the tests queue.
+        self.now = timezone.now() + datetime.timedelta(seconds=1)
+
+    def test_claims_due_tasks_once(self):
+        queued = record_call.delay('ok')
+        record_call.delay('later', run_at=self.now + datetime.timedelta(minutes=5))
+        self.assertEqual((queued.name, queued.args, queued.max_attempts),
+                         ('e_learning_app.tests.record_call', ['ok'], 2))
+
+        claimed = tasks.claim(10, now=self.now)
+        self.assertEqual([row.pk for row in claimed], [queued.pk])
+        self.assertEqual((claimed[0].status, claimed[0].attempts), ('running', 1))
+        self.assertEqual(tasks.claim(10, now=self.now), [])
+
+    def test_runs_a_task_and_reports_its_traceback(self):
+        # execute() resets connections, as a worker thread should, which would end the test's transaction.
+        with mock.patch.object(tasks, 'close_old_connections'):
+            self.assertIsNone(tasks.execute('e_learning_app.tests.record_call', ['ok'], {}))
+            error = tasks.execute('e_learning_app.tests.record_call', ['fail'], {})
+        self.assertEqual(CALLS, ['ok', 'fail'])
+        self.assertIn('ValueError: boom', error)
+
+    def test_failures_back_off_then_fail_for_good(self):
+        record_call.delay('fail')
+        row = tasks.claim(1, now=self.now)[0]
+        tasks.finish(row, 'boom', now=self.now)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.last_error), ('queued', 'boom'))
+        # BACKOFF_BASE seconds for the first retry, jittered down to half.
+        self.assertGreaterEqual(row.run_at, self.now + datetime.timedelta(seconds=5))
+        self.assertLessEqual(row.run_at, self.now + datetime.timedelta(seconds=10))
+        self.assertEqual(tasks.claim(1, now=self.now), [])
+
+        row = tasks.claim(1, now=row.run_at)[0]
+        self.assertEqual(row.attempts, 2)
+        tasks.finish(row, 'boom again', now=self.now)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.last_error), ('failed', 'boom again'))
+
+    def test_backoff_is_capped(self):
+        record_call.delay('fail')
+        Task.objects.update(attempts=9, max_attempts=20)
+        row = tasks.claim(1, now=self.now)[0]
+        tasks.finish(row, 'boom', now=self.now)
+        row.refresh_from_db()
+        self.assertLessEqual(row.run_at, self.now + datetime.timedelta(seconds=30))
+
+    def test_expired_claims_are_requeued_and_late_results_ignored(self):
+        record_call.delay('ok')
+        record_call.delay('ok')
+        lost, dead = tasks.claim(2, now=self.now)
+        Task.objects.update(claimed_at=self.now - datetime.timedelta(seconds=61))
+        Task.objects.filter(pk=dead.pk).update(attempts=2)
+        fresh = record_call.delay('ok')
+        tasks.claim(1, now=self.now)
+
+        self.assertEqual(tasks.requeue_stale(now=self.now), 1)
+        statuses = dict(Task.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {lost.pk: 'queued', dead.pk: 'failed', fresh.pk: 'running'})
+
+        # The worker that lost its claim finishing late changes nothing.
+        self.assertEqual(tasks.finish(lost, None, now=self.now), 0)
+        self.assertEqual(Task.objects.get(pk=lost.pk).status, 'queued')
+
+    def test_purges_old_finished_tasks(self):
+        record_call.delay('ok')
+        row = tasks.claim(1, now=self.now)[0]
+        tasks.finish(row, None, now=self.now - datetime.timedelta(hours=25))
+        self.assertEqual(tasks.purge_done(now=self.now), 1)
+
+
+# ============= ENROLLMENT AND PAYMENT =============
+class PaymentTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = create_course(create_user('trainer', 'trainer'))
+        self.student = create_user('student', 'student')
+        self.client.force_login(self.student)
+
+    def pay(self, enrollment_id, key, transaction_id):
+        return self.client.post(reverse('student_make_payment', args=[enrollment_id]), {
+            'amount': self.course.fee, 'payment_method': 'upi', 'transaction_id': transaction_id,
+            'notes': '', 'idempotency_key': key,
+        })
+
+    def test_enrolling_twice_lands_on_one_pending_enrollment(self):
+        first = self.client.get(reverse('student_enroll_course', args=[self.course.id]))
+        enrollment = Enrollment.objects.get()
+        self.assertRedirects(first, reverse('student_make_payment', args=[enrollment.id]),
+                             fetch_redirect_response=False)
+        self.assertEqual(enrollment.status, 'pending')
+        self.client.get(reverse('student_enroll_course', args=[self.course.id]))
+        self.assertEqual(Enrollment.objects.count(), 1)
+
+    def test_retried_payment_is_answered_from_the_stored_one(self):
+        enrollment_id, _ = Enrollment.objects.enroll(self.student, self.course)
+        self.assertRedirects(self.pay(enrollment_id, 'key-1', 'txn-1'), reverse('student_dashboard'),
+                             fetch_redirect_response=False)
+        self.pay(enrollment_id, 'key-1', 'txn-2')
+        self.pay(enrollment_id, 'key-2', 'txn-3')
+        self.assertEqual(list(Payment.objects.values_list('transaction_id', flat=True)), ['txn-1'])
+        self.assertEqual(Enrollment.objects.get().status, 'active')
+        self.assertEqual(PlatformStats.objects.get().total_enrollments, 1)
+
+    def test_reused_transaction_id_is_a_form_error(self):
+        other = create_course(self.course.trainer, name='Django')
+        first_id, _ = Enrollment.objects.enroll(self.student, self.course)
+        second_id, _ = Enrollment.objects.enroll(self.student, other)
+        self.pay(first_id, 'key-1', 'txn-1')
+        response = self.pay(second_id, 'key-2', 'txn-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].has_error('transaction_id'))
+        self.assertEqual(Enrollment.objects.get(pk=second_id).status, 'pending')
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EnrollmentRaceTests(TransactionTestCase):
+    """
+    Concurrent double-clicks, retries and extra tabs, sent from threads with
+    their own connections. ``manage.py enrollment_race`` runs the same check
+    at a larger scale against a file database.
+    """
+
+    def test_parallel_requests_leave_one_enrollment_and_payment_each(self):
+        race = EnrollmentRace(stdout=io.StringIO())
+        PlatformStats.rebuild()
+        course, users = race.seed(students=3)
+        enroll = race.burst(users, 4, lambda client, user, i: client.get(
+            reverse('student_enroll_course', args=[course.pk])))
+        enrollment_ids = dict(Enrollment.objects.filter(course=course).values_list('student_id', 'id'))
+        pay = race.burst(users, 4, lambda client, user, i: client.post(
+            reverse('student_make_payment', args=[enrollment_ids[user.pk]]), race.payment_data(course, user, i)))
+        self.assertEqual(race.verify(course, users, {'enroll': enroll, 'pay': pay}), [])
+
+
+# ============= AUTHENTICATION =============
+class RoleRequiredTests(AppTestCase):
+    def test_anonymous_users_are_sent_to_log_in(self):
+        url = reverse('student_view_assignments')
+        self.assertRedirects(self.client.get(url), f'{reverse("login")}?next={url}', fetch_redirect_response=False)
+
+    def test_other_roles_are_sent_home_with_a_message(self):
+        self.client.force_login(create_user('trainer', 'trainer'))
+        response = self.client.get(reverse('student_view_assignments'), follow=True)
+        self.assertRedirects(response, reverse('home'))
+        self.assertContains(response, 'Access denied.')
+
+    def test_json_endpoints_answer_403(self):
+        assignment = create_assignment(create_course(create_user('trainer', 'trainer')))
+        self.client.force_login(assignment.created_by)
+        response = self.client.post(reverse('student_start_upload', args=[assignment.id]))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'error': 'Access denied.'})
+
+
+class PrincipalCacheTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('student', 'student')
+        self.client.force_login(self.user)
+        self.url = reverse('student_view_assignments')
+
+    def principal(self):
+        return caches[PRINCIPAL_CACHE].get(f'principal:{self.user.pk}')
+
+    def test_warm_requests_load_neither_session_nor_user(self):
+        self.client.get(self.url)
+        self.assertEqual(self.principal()['user_type'], 'student')
+        # Only the view's own query for the student's enrollments.
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_saving_the_user_drops_the_principal(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=['last_login'])
+        self.assertIsNotNone(self.principal())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_type = 'trainer'
+            self.user.save()
+        self.assertIsNone(self.principal())
+        self.assertRedirects(self.client.get(self.url), reverse('home'), fetch_redirect_response=False)
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('new password')
+            self.user.save()
+        response = self.client.get(self.url)
+        self.assertRedirects(response, f'{reverse("login")}?next={self.url}', fetch_redirect_response=False)
+
+
+# ============= READ REPLICA =============
+class ReplicaTests(AppTestCase):
+    # The replica mirrors the test database.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.object(replica, '_replica_down_until', 0.0))
+        self.factory = RequestFactory()
+        self.router = replica.ReplicaRouter()
+
+    def routed(self, request, fail_on_replica=False):
+        """The aliases a replica_reads view read Course and Session from, once per run of the view."""
+        runs = []
+
+        @replica.replica_reads
+        def view(request):
+            runs.append((self.router.db_for_read(Course), self.router.db_for_read(Session)))
+            if fail_on_replica and runs[-1][0] == 'replica':
+                raise OperationalError('replica is gone')
+            return HttpResponse()
+
+        view(request)
+        return runs
+
+    def test_reads_go_to_the_replica_unless_pinned(self):
+        self.assertEqual(self.routed(self.factory.get('/')), [('replica', 'default')])
+        self.assertEqual(self.routed(self.factory.post('/')), [('default', 'default')])
+        request = self.factory.get('/')
+        request.COOKIES['replica_pin'] = '1'
+        self.assertEqual(self.routed(request), [('default', 'default')])
+        self.assertEqual(self.router.db_for_read(Course), 'default')
+
+    def test_failed_replica_reruns_on_the_primary_and_is_skipped(self):
+        with self.assertLogs('e_learning_app.replica', 'WARNING'):
+            runs = self.routed(self.factory.get('/'), fail_on_replica=True)
+        self.assertEqual([course for course, _ in runs], ['replica', 'default'])
+        self.assertEqual(self.routed(self.factory.get('/')), [('default', 'default')])
+
+        with mock.patch.object(replica.time, 'monotonic', return_value=time.monotonic() + 31):
+            self.assertEqual(self.routed(self.factory.get('/')), [('replica', 'default')])
+
+    def test_unsafe_requests_pin_the_client_to_the_primary(self):
+        self.client.force_login(create_user('manager', 'manager'))
+        response = self.client.post(reverse('logout'))
+        self.assertEqual(response.cookies['replica_pin']['max-age'], 10)
+        self.assertNotIn('replica_pin', self.client.get(reverse('home')).cookies)
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ReplicaPageTests(TransactionTestCase):
+    # Committed rows, since the replica alias has its own connection.
+    databases = {'default', 'replica'}
+
+    def test_manager_pages_render_from_the_replica(self):
+        course = create_course(create_user('trainer', 'trainer'))
+        student = create_user('student', 'student', first_name='Ada', last_name='Lovelace')
+        Enrollment.objects.create(student=student, course=course, status='active')
+        self.client.force_login(create_user('manager', 'manager'))
+        with self.assertNoLogs('e_learning_app.replica', 'WARNING'):
+            response = self.client.get(reverse('manager_analyse_progress'))
+        self.assertContains(response, 'Ada Lovelace')
+        self.assertContains(response, course.name)
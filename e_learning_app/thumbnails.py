@@ -0,0 +1,108 @@
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import User
+from .tasks import task
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+def thumbnail_settings():
+    config = {
+        'SIZES': (32, 64, 128, 256),
+        'FORMATS': ('webp', 'jpeg'),
+        'QUALITY': 80,
+    }
+    config.update(getattr(settings, 'THUMBNAILS', {}))
+    return config
+
+
+def variant_name(name, size, fmt):
+    """``profiles/me.jpg`` -> ``profiles/thumbs/me.jpg.64.webp``: fixed per source, size and format."""
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, 'thumbs', f'{filename}.{size}.{fmt}')
+
+
+def variant_names(name):
+    config = thumbnail_settings()
+    return [variant_name(name, size, fmt) for size in config['SIZES'] for fmt in config['FORMATS']]
+
+
+def pick_size(size):
+    """The smallest configured size that covers ``size`` pixels, else the largest."""
+    sizes = sorted(thumbnail_settings()['SIZES'])
+    return next((s for s in sizes if s >= size), sizes[-1])
+
+
+def generate(name, storage=None, force=False):
+    """
+    Write every square variant of image ``name`` and return the names written.
+    JPEG sources are decoded at reduced scale (draft mode) straight to roughly
+    the largest variant, and each smaller size is resampled from the one above
+    it, so a 10 MB phone photo never has to be decoded at full size.
+    """
+    storage = storage or default_storage
+    config = thumbnail_settings()
+    wanted = [
+        (size, fmt) for size in sorted(config['SIZES'], reverse=True) for fmt in config['FORMATS']
+        if force or not storage.exists(variant_name(name, size, fmt))
+    ]
+    if not wanted:
+        return []
+
+    with storage.open(name, 'rb') as fh, Image.open(fh) as source:
+        largest = wanted[0][0]
+        source.draft('RGB', (largest * 2, largest * 2))
+        image = _flatten(ImageOps.exif_transpose(source))
+
+    written = []
+    for size in sorted({size for size, _ in wanted}, reverse=True):
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        for fmt in (fmt for s, fmt in wanted if s == size):
+            buffer = io.BytesIO()
+            image.save(buffer, PIL_FORMATS[fmt], quality=config['QUALITY'], optimize=True)
+            written.append(_replace(storage, variant_name(name, size, fmt), buffer.getvalue()))
+    return written
+
+
+def _flatten(image):
+    """RGB copy of ``image`` with any transparency composited onto white (JPEG has no alpha)."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _replace(storage, name, data):
+    # Storage.save() renames on collision; deleting first keeps the name fixed.
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def delete_variants(name, storage=None):
+    storage = storage or default_storage
+    for variant in variant_names(name):
+        if storage.exists(variant):
+            storage.delete(variant)
+
+
+@task
+def generate_variants(user_id):
+    # Looked up when the task runs, so a task queued for a picture that has
+    # since been replaced builds the current one instead of resurrecting the old.
+    name = User.objects.filter(pk=user_id).values_list('profile_picture', flat=True).first()
+    if name:
+        generate(name)
+
+
+@task
+def remove_variants(name):
+    delete_variants(name)
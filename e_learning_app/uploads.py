@@ -0,0 +1,110 @@
+import fcntl
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+
+READ_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class ChunkError(Exception):
+    """A chunk that cannot be appended; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class AssembledFile(File):
+    """
+    A fully assembled upload on local disk. Offering temporary_file_path()
+    lets storages move it into place (as they do with Django's own large
+    uploads) instead of copying it.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def chunked_upload_settings():
+    config = {
+        'DIR': Path(settings.BASE_DIR) / 'uploads',
+        'CHUNK_SIZE': 8 * 1024 * 1024,
+        'MAX_SIZE': 2 * 1024 * 1024 * 1024,
+        'EXPIRE_HOURS': 24,
+    }
+    config.update(getattr(settings, 'CHUNKED_UPLOADS', {}))
+    return config
+
+
+def part_path(upload):
+    return Path(chunked_upload_settings()['DIR']) / f'{upload.pk}.part'
+
+
+def parse_content_range(header, size):
+    """(start, end) of a ``Content-Range: bytes start-end/size`` header, end exclusive."""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise ChunkError('Content-Range must be "bytes <start>-<end>/<size>".')
+    start, last, total = map(int, match.groups())
+    if total != size or last < start or last >= size:
+        raise ChunkError(f'Content-Range {header!r} does not fit a {size}-byte upload.', status=416)
+    return start, last + 1
+
+
+def write_chunk(upload, stream, start, end, sha256=None):
+    """
+    Write bytes ``start``-``end`` of ``upload`` from ``stream`` at their
+    offset in the part file, streaming in small reads so the chunk is never
+    held in memory. If the chunk is short or fails ``sha256``, the part
+    file is cut back to ``start`` and ChunkError is raised. Otherwise it is
+    cut to ``end``, which drops bytes a crashed or rejected attempt left past
+    the recorded offset.
+    """
+    path = part_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ChunkError('Another chunk of this upload is being written.', status=409)
+        position, remaining = start, end - start
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(fd, view, position)
+                position += written
+                view = view[written:]
+        if remaining:
+            os.truncate(fd, start)
+            raise ChunkError(f'Chunk ended {remaining} bytes short.')
+        if sha256 and digest.hexdigest() != sha256.lower():
+            os.truncate(fd, start)
+            raise ChunkError('Chunk checksum does not match X-Chunk-SHA256.', status=422)
+        os.truncate(fd, end)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for data in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def discard(upload):
+    part_path(upload).unlink(missing_ok=True)
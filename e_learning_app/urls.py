@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     # Home and Authentication
     path('', views.home, name='home'),
+    path('search/', views.search, name='search'),
     path('student/register/', views.student_register, name='student_register'),
     path('trainer/register/', views.trainer_register, name='trainer_register'),
     path('login/', views.user_login, name='login'),
@@ -16,6 +17,9 @@ urlpatterns = [
     path('student/courses/', views.student_view_courses, name='student_view_courses'),
     path('student/assignments/', views.student_view_assignments, name='student_view_assignments'),
     path('student/submit/<int:assignment_id>/', views.student_submit_assignment, name='student_submit_assignment'),
+    path('student/submit/<int:assignment_id>/upload/', views.student_start_upload, name='student_start_upload'),
+    path('student/uploads/<uuid:upload_id>/', views.student_upload_chunk, name='student_upload_chunk'),
+    path('student/uploads/<uuid:upload_id>/finalize/', views.student_finalize_upload, name='student_finalize_upload'),
     path('student/feedback/', views.student_give_feedback, name='student_give_feedback'),
     path('student/progress/', views.student_track_progress, name='student_track_progress'),
     
@@ -26,7 +30,9 @@ urlpatterns = [
     path('trainer/assignments/', views.trainer_manage_assignments, name='trainer_manage_assignments'),
     path('trainer/submissions/<int:assignment_id>/', views.trainer_view_submissions, name='trainer_view_submissions'),
     path('trainer/grade/<int:submission_id>/', views.trainer_grade_submission, name='trainer_grade_submission'),
+    path('trainer/grade/bulk/<int:assignment_id>/', views.trainer_bulk_grade, name='trainer_bulk_grade'),
     path('trainer/attendance/', views.trainer_mark_attendance, name='trainer_mark_attendance'),
+    path('trainer/attendance/roster/', views.trainer_roster_attendance, name='trainer_roster_attendance'),
     path('trainer/progress/<int:enrollment_id>/', views.trainer_update_progress, name='trainer_update_progress'),
     
     # Manager URLs
@@ -38,4 +44,10 @@ urlpatterns = [
     path('manager/progress/', views.manager_analyse_progress, name='manager_analyse_progress'),
     path('manager/payments/', views.manager_view_payments, name='manager_view_payments'),
     path('manager/payment/update/<int:payment_id>/', views.manager_update_payment, name='manager_update_payment'),
+    path('manager/export/<str:dataset>/', views.manager_export, name='manager_export'),
+    
+    # Protected media
+    path('files/submissions/<int:submission_id>/', views.download_submission, name='download_submission'),
+    path('files/profiles/<int:user_id>/', views.profile_picture, name='profile_picture'),
+    path('files/profiles/<int:user_id>/<int:size>.<slug:fmt>', views.profile_picture, name='profile_thumbnail'),
 ]
\ No newline at end of file
@@ -1,19 +1,69 @@
+import os
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Avg, Count, Q
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.urls import reverse
 from django.utils import timezone
-from .models import User, Course, Enrollment, Payment, Assignment, Submission, Feedback, Attendance
+from django.utils.cache import patch_cache_control
+from django.utils.text import slugify
+from django.views.decorators.http import require_POST
+from .models import (User, Course, Enrollment, Payment, Assignment, Submission, Feedback, Attendance, PlatformStats,
+                     ChunkedUpload)
+from .pagination import paginate_keyset
+from .catalog import active_catalog, aactive_catalog, available_courses
+from .search import SEARCH_KINDS, search as search_index
 from .forms import (StudentRegistrationForm, TrainerRegistrationForm, CustomLoginForm,
                     CourseForm, EnrollmentForm, PaymentForm, AssignmentForm, SubmissionForm,
-                    GradeSubmissionForm, FeedbackForm, AttendanceForm, UpdatePaymentForm, TrainerAllotmentForm)
+                    GradeSubmissionForm, FeedbackForm, AttendanceForm, UpdatePaymentForm, TrainerAllotmentForm,
+                    RosterSelectForm, RosterAttendanceForm, BulkGradeForm, GradeUploadForm, ExportForm,
+                    ChunkedUploadForm)
+from .exports import EXPORTS, CONTENT_TYPES, stream_rows, astream_rows
+from .auth import role_required
+from .media import serve_media
+from .replica import replica_reads
+from .thumbnails import thumbnail_settings, variant_name
+from .uploads import (ChunkError, AssembledFile, chunked_upload_settings, parse_content_range, write_chunk,
+                      file_sha256, part_path, discard)
+
+
+# Async views evaluate their querysets up front with the async ORM and then
+# render in a worker thread, where the template (and context processors such
+# as request.user) may still touch the database.
+_arender = sync_to_async(render)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
 
 
 # ============= AUTHENTICATION VIEWS =============
 def home(request):
-    courses = Course.objects.filter(is_active=True)[:6]
-    return render(request, 'home.html', {'courses': courses})
+    catalog = active_catalog()
+    return render(request, 'home.html', {'courses': catalog.courses[:6], 'catalog_version': catalog.version})
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    user = request.user
+    kinds, course_ids = ['course'], None
+    if user.is_authenticated and user.user_type == 'manager':
+        kinds, course_ids = list(SEARCH_KINDS), None
+    elif user.is_authenticated and user.user_type == 'trainer':
+        kinds, course_ids = ['course', 'assignment'], Course.objects.filter(trainer=user).values_list('id', flat=True)
+    elif user.is_authenticated and user.user_type == 'student':
+        kinds = ['course', 'assignment']
+        course_ids = Enrollment.objects.filter(student=user, status='active').values_list('course_id', flat=True)
+    
+    results = search_index(query, kinds=kinds, course_ids=course_ids) if query else []
+    return render(request, 'search.html', {'query': query, 'results': results})
 
 
 def student_register(request):
@@ -69,100 +119,106 @@ def user_logout(request):
 
 
 # ============= STUDENT VIEWS =============
-@login_required
-def student_dashboard(request):
-    if request.user.user_type != 'student':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
+@role_required('student')
+async def student_dashboard(request):
+    user = request.user
     
-    enrollments = Enrollment.objects.filter(student=request.user)
-    available_courses = Course.objects.filter(is_active=True).exclude(
-        id__in=enrollments.values_list('course_id', flat=True)
-    )
+    enrollments = await _alist(Enrollment.objects.for_student().filter(student=user))
+    catalog = await aactive_catalog()
     
     context = {
         'enrollments': enrollments,
-        'available_courses': available_courses,
+        'available_courses': available_courses(catalog, [enrollment.course_id for enrollment in enrollments]),
+        'catalog_version': catalog.version,
     }
-    return render(request, 'student/dashboard.html', context)
+    return await _arender(request, 'student/dashboard.html', context)
 
 
-@login_required
+@role_required('student')
 def student_enroll_course(request, course_id):
-    if request.user.user_type != 'student':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
     course = get_object_or_404(Course, id=course_id, is_active=True)
     
-    if Enrollment.objects.filter(student=request.user, course=course).exists():
+    # One statement whether or not the student is already enrolled, so a
+    # double-click lands on the same pending enrollment instead of an IntegrityError.
+    enrollment_id, status = Enrollment.objects.enroll(request.user, course)
+    if status != 'pending':
         messages.warning(request, 'You are already enrolled in this course.')
         return redirect('student_dashboard')
     
-    enrollment = Enrollment.objects.create(student=request.user, course=course, status='pending')
     messages.success(request, f'Successfully enrolled in {course.name}. Please complete payment.')
-    return redirect('student_make_payment', enrollment_id=enrollment.id)
+    return redirect('student_make_payment', enrollment_id=enrollment_id)
 
 
-@login_required
+def _payment_already_made(request):
+    messages.info(request, 'This payment has already been made. You can access the course.')
+    return redirect('student_dashboard')
+
+
+@role_required('student')
 def student_make_payment(request, enrollment_id):
-    if request.user.user_type != 'student':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    enrollment = get_object_or_404(Enrollment, id=enrollment_id, student=request.user)
+    enrollment = get_object_or_404(Enrollment.objects.for_student(), id=enrollment_id, student=request.user)
     
     if request.method == 'POST':
+        # A retried POST (double-click, reload, flaky network) carries the key
+        # of the attempt that already went through: answer from the stored payment.
+        key = request.POST.get('idempotency_key', '')
+        if enrollment.status in Enrollment.PAID_STATUSES or (
+                key and enrollment.payments.filter(idempotency_key=key).exists()):
+            return _payment_already_made(request)
+        
         form = PaymentForm(request.POST)
         if form.is_valid():
             payment = form.save(commit=False)
             payment.enrollment = enrollment
             payment.status = 'completed'
-            payment.save()
-            enrollment.status = 'active'
-            enrollment.save()
-            messages.success(request, 'Payment successful! You can now access the course.')
-            return redirect('student_dashboard')
+            try:
+                with transaction.atomic():
+                    # Insert first: the write takes SQLite's database lock, and
+                    # the row lock does the same job elsewhere, so no concurrent
+                    # payment can activate the enrollment between this read and
+                    # the update below. NO KEY UPDATE does not conflict with the
+                    # key-share lock PostgreSQL takes for the payment's foreign key.
+                    payment.save()
+                    current = Enrollment.objects.select_for_update(
+                        no_key=connection.features.has_select_for_no_key_update,
+                    ).filter(pk=enrollment.pk).values_list('status', flat=True).get()
+                    if current in Enrollment.PAID_STATUSES:
+                        transaction.set_rollback(True)
+                        return _payment_already_made(request)
+                    enrollment.status = 'active'
+                    enrollment.save(update_fields=['status'])
+            except IntegrityError:
+                # Lost the race to a concurrent POST with the same key or transaction id.
+                if key and enrollment.payments.filter(idempotency_key=key).exists():
+                    return _payment_already_made(request)
+                form.add_error('transaction_id', 'This transaction ID has already been used.')
+            else:
+                messages.success(request, 'Payment successful! You can now access the course.')
+                return redirect('student_dashboard')
     else:
-        form = PaymentForm(initial={'amount': enrollment.course.fee})
+        if enrollment.status in Enrollment.PAID_STATUSES:
+            return _payment_already_made(request)
+        form = PaymentForm(initial={'amount': enrollment.course.fee, 'idempotency_key': uuid.uuid4().hex})
     
     return render(request, 'student/make_payment.html', {'form': form, 'enrollment': enrollment})
 
 
-@login_required
+@role_required('student')
 def student_view_courses(request):
-    if request.user.user_type != 'student':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    enrollments = Enrollment.objects.filter(student=request.user, status='active')
+    enrollments = Enrollment.objects.for_student().filter(student=request.user, status='active')
     return render(request, 'student/view_courses.html', {'enrollments': enrollments})
 
 
-@login_required
+@role_required('student')
 def student_view_assignments(request):
-    if request.user.user_type != 'student':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
     enrolled_courses = Enrollment.objects.filter(student=request.user, status='active').values_list('course', flat=True)
-    assignments = Assignment.objects.filter(course__in=enrolled_courses)
-    submissions = Submission.objects.filter(student=request.user)
-    
-    context = {
-        'assignments': assignments,
-        'submissions': submissions,
-    }
-    return render(request, 'student/view_assignments.html', context)
+    assignments = Assignment.objects.with_submission_for(request.user).filter(course__in=enrolled_courses)
+    return render(request, 'student/view_assignments.html', {'assignments': assignments})
 
 
-@login_required
+@role_required('student')
 def student_submit_assignment(request, assignment_id):
-    if request.user.user_type != 'student':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    assignment = get_object_or_404(Assignment, id=assignment_id)
+    assignment = get_object_or_404(Assignment.objects.for_listing(), id=assignment_id)
     
     if Submission.objects.filter(assignment=assignment, student=request.user).exists():
         messages.warning(request, 'You have already submitted this assignment.')
@@ -174,21 +230,126 @@ def student_submit_assignment(request, assignment_id):
             submission = form.save(commit=False)
             submission.assignment = assignment
             submission.student = request.user
-            submission.save()
+            try:
+                # Saving the file takes a storage reference; roll it back if the row is refused.
+                with transaction.atomic():
+                    submission.save()
+            except IntegrityError:
+                messages.warning(request, 'You have already submitted this assignment.')
+                return redirect('student_view_assignments')
             messages.success(request, 'Assignment submitted successfully!')
             return redirect('student_view_assignments')
     else:
         form = SubmissionForm()
     
-    return render(request, 'student/submit_assignment.html', {'form': form, 'assignment': assignment})
+    return render(request, 'student/submit_assignment.html', {
+        'form': form,
+        'assignment': assignment,
+        'chunk_size': chunked_upload_settings()['CHUNK_SIZE'],
+    })
+
+
+# Resumable uploads for large submissions: POST to start (or resume) one,
+# GET its confirmed offset, PUT byte ranges, then POST to finalize. Files at
+# or below one chunk go through student_submit_assignment as before.
+def _upload_state(upload, **extra):
+    return JsonResponse({
+        'id': str(upload.id),
+        'url': reverse('student_upload_chunk', args=[upload.id]),
+        'finalize_url': reverse('student_finalize_upload', args=[upload.id]),
+        'offset': upload.offset,
+        'size': upload.size,
+        'chunk_size': chunked_upload_settings()['CHUNK_SIZE'],
+    }, **extra)
+
+
+def _upload_error(message, status, upload=None):
+    data = {'error': message}
+    if upload is not None:
+        data['offset'] = upload.offset
+    return JsonResponse(data, status=status)
+
+
+@role_required('student', json=True)
+@require_POST
+def student_start_upload(request, assignment_id):
+    assignment = get_object_or_404(Assignment.objects.for_listing(), id=assignment_id)
+    if Submission.objects.filter(assignment=assignment, student=request.user).exists():
+        return _upload_error('You have already submitted this assignment.', 409)
+    
+    form = ChunkedUploadForm(request.POST)
+    if not form.is_valid():
+        return _upload_error(form.errors.get_json_data(), 400)
+    
+    # Starting the same file again picks up where the last attempt stopped.
+    upload = (ChunkedUpload.objects.filter(student=request.user, assignment=assignment, **form.cleaned_data)
+              .order_by('-updated_at').first())
+    if upload is not None:
+        return _upload_state(upload)
+    upload = ChunkedUpload.objects.create(student=request.user, assignment=assignment, **form.cleaned_data)
+    return _upload_state(upload, status=201)
+
+
+@role_required('student', json=True)
+def student_upload_chunk(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, student=request.user)
+    if request.method == 'GET':
+        return _upload_state(upload)
+    if request.method != 'PUT':
+        return HttpResponseNotAllowed(['GET', 'PUT'])
+    
+    try:
+        start, end = parse_content_range(request.headers.get('Content-Range'), upload.size)
+        if end <= upload.offset:
+            # A retry of a chunk that already arrived.
+            return _upload_state(upload)
+        if start != upload.offset:
+            raise ChunkError(f'Expected a chunk starting at byte {upload.offset}.', status=409)
+        if end - start > chunked_upload_settings()['CHUNK_SIZE']:
+            raise ChunkError('Chunk is larger than the chunk size.', status=413)
+        if request.headers.get('Content-Length') != str(end - start):
+            raise ChunkError('Content-Length does not match Content-Range.')
+        write_chunk(upload, request, start, end, request.headers.get('X-Chunk-SHA256'))
+    except ChunkError as exc:
+        return _upload_error(str(exc), exc.status, upload)
+    
+    ChunkedUpload.objects.filter(pk=upload.pk, offset=start).update(offset=end, updated_at=timezone.now())
+    upload.offset = end
+    return _upload_state(upload)
+
+
+@role_required('student', json=True)
+@require_POST
+def student_finalize_upload(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload.objects.select_related('assignment'), id=upload_id, student=request.user)
+    if not upload.complete:
+        return _upload_error(f'Upload is incomplete: {upload.offset} of {upload.size} bytes.', 409, upload)
+    path = part_path(upload)
+    if not path.exists() or (upload.sha256 and file_sha256(path) != upload.sha256):
+        discard(upload)
+        ChunkedUpload.objects.filter(pk=upload.pk).update(offset=0, updated_at=timezone.now())
+        upload.offset = 0
+        return _upload_error('The assembled file is missing or fails its SHA-256; upload it again.', 422, upload)
+    
+    submission = Submission(assignment=upload.assignment, student=request.user,
+                            submission_text=request.POST.get('submission_text', ''))
+    try:
+        with transaction.atomic(), open(path, 'rb') as fh:
+            submission.submission_file.save(upload.filename, AssembledFile(fh), save=False)
+            submission.save()
+            upload.delete()
+    except IntegrityError:
+        upload.delete()
+        discard(upload)
+        return _upload_error('You have already submitted this assignment.', 409)
+    discard(upload)
+    
+    messages.success(request, 'Assignment submitted successfully!')
+    return JsonResponse({'redirect': reverse('student_view_assignments')}, status=201)
 
 
-@login_required
+@role_required('student')
 def student_give_feedback(request):
-    if request.user.user_type != 'student':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
     if request.method == 'POST':
         form = FeedbackForm(request.POST)
         if form.is_valid():
@@ -205,49 +366,36 @@ def student_give_feedback(request):
     return render(request, 'student/give_feedback.html', {'form': form})
 
 
-@login_required
+@role_required('student')
 def student_track_progress(request):
-    if request.user.user_type != 'student':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    enrollments = Enrollment.objects.filter(student=request.user)
+    enrollments = Enrollment.objects.for_student().filter(student=request.user)
     return render(request, 'student/track_progress.html', {'enrollments': enrollments})
 
 
 # ============= TRAINER VIEWS =============
-@login_required
-def trainer_dashboard(request):
-    if request.user.user_type != 'trainer':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
+@role_required('trainer')
+async def trainer_dashboard(request):
+    user = request.user
     
-    courses = Course.objects.filter(trainer=request.user)
-    total_students = Enrollment.objects.filter(course__trainer=request.user, status='active').count()
+    courses = await _alist(Course.objects.filter(trainer=user))
+    total_students = sum(course.active_enrollment_count for course in courses)
     
     context = {
         'courses': courses,
         'total_students': total_students,
     }
-    return render(request, 'trainer/dashboard.html', context)
+    return await _arender(request, 'trainer/dashboard.html', context)
 
 
-@login_required
+@role_required('trainer')
 def trainer_view_students(request):
-    if request.user.user_type != 'trainer':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    enrollments = Enrollment.objects.filter(course__trainer=request.user, status='active')
+    enrollments = Enrollment.objects.for_listing().filter(course__trainer=request.user, status='active')
+    enrollments = paginate_keyset(enrollments, request, '-enrollment_date')
     return render(request, 'trainer/view_students.html', {'enrollments': enrollments})
 
 
-@login_required
+@role_required('trainer')
 def trainer_create_assignment(request):
-    if request.user.user_type != 'trainer':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
     if request.method == 'POST':
         form = AssignmentForm(request.POST)
         if form.is_valid():
@@ -263,23 +411,15 @@ def trainer_create_assignment(request):
     return render(request, 'trainer/create_assignment.html', {'form': form})
 
 
-@login_required
+@role_required('trainer')
 def trainer_manage_assignments(request):
-    if request.user.user_type != 'trainer':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    assignments = Assignment.objects.filter(created_by=request.user)
+    assignments = Assignment.objects.with_submission_counts().filter(created_by=request.user)
     return render(request, 'trainer/manage_assignments.html', {'assignments': assignments})
 
 
-@login_required
+@role_required('trainer')
 def trainer_grade_submission(request, submission_id):
-    if request.user.user_type != 'trainer':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    submission = get_object_or_404(Submission, id=submission_id)
+    submission = get_object_or_404(Submission.objects.for_gradebook(), id=submission_id)
     
     if request.method == 'POST':
         form = GradeSubmissionForm(request.POST, instance=submission)
@@ -296,24 +436,59 @@ def trainer_grade_submission(request, submission_id):
     return render(request, 'trainer/grade_submission.html', {'form': form, 'submission': submission})
 
 
-@login_required
+@role_required('trainer')
 def trainer_view_submissions(request, assignment_id):
-    if request.user.user_type != 'trainer':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
     assignment = get_object_or_404(Assignment, id=assignment_id, created_by=request.user)
-    submissions = Submission.objects.filter(assignment=assignment)
+    submissions = Submission.objects.for_gradebook().filter(assignment=assignment)
     
     return render(request, 'trainer/view_submissions.html', {'assignment': assignment, 'submissions': submissions})
 
 
-@login_required
+@role_required('trainer')
+def trainer_bulk_grade(request, assignment_id):
+    assignment = get_object_or_404(Assignment.objects.for_listing(), id=assignment_id, created_by=request.user)
+    submissions = list(Submission.objects.for_gradebook().filter(assignment=assignment).order_by('student__username'))
+    form_kwargs = {'submissions': submissions, 'max_marks': assignment.max_marks}
+    
+    grades = None
+    if request.method == 'POST' and 'grades_file' in request.FILES:
+        form = BulkGradeForm(**form_kwargs)
+        upload_form = GradeUploadForm(request.POST, request.FILES, **form_kwargs)
+        if upload_form.is_valid():
+            grades = upload_form.grades
+    elif request.method == 'POST':
+        form = BulkGradeForm(request.POST, **form_kwargs)
+        upload_form = GradeUploadForm(**form_kwargs)
+        if form.is_valid():
+            grades = form.grades()
+    else:
+        form = BulkGradeForm(**form_kwargs)
+        upload_form = GradeUploadForm(**form_kwargs)
+    
+    if grades is not None:
+        now = timezone.now()
+        graded = []
+        for submission in submissions:
+            if submission.id not in grades:
+                continue
+            marks, feedback = grades[submission.id]
+            if (marks, feedback) == (submission.marks_obtained, submission.feedback):
+                continue
+            submission.marks_obtained = marks
+            submission.feedback = feedback
+            submission.graded_by = request.user
+            submission.graded_at = now
+            graded.append(submission)
+        Submission.objects.bulk_update(graded, ['marks_obtained', 'feedback', 'graded_by', 'graded_at'])
+        messages.success(request, f'Grades saved for {len(graded)} submissions.')
+        return redirect('trainer_view_submissions', assignment_id=assignment.id)
+    
+    context = {'assignment': assignment, 'form': form, 'upload_form': upload_form}
+    return render(request, 'trainer/bulk_grade.html', context)
+
+
+@role_required('trainer')
 def trainer_mark_attendance(request):
-    if request.user.user_type != 'trainer':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
     if request.method == 'POST':
         form = AttendanceForm(request.POST)
         if form.is_valid():
@@ -324,24 +499,56 @@ def trainer_mark_attendance(request):
             return redirect('trainer_mark_attendance')
     else:
         form = AttendanceForm()
-        form.fields['enrollment'].queryset = Enrollment.objects.filter(course__trainer=request.user, status='active')
+        form.fields['enrollment'].queryset = Enrollment.objects.for_listing().filter(course__trainer=request.user, status='active')
     
     return render(request, 'trainer/mark_attendance.html', {'form': form})
 
 
-@login_required
+@role_required('trainer')
+def trainer_roster_attendance(request):
+    select_form = RosterSelectForm(request.GET or None, trainer=request.user)
+    roster_form = None
+    
+    if select_form.is_valid():
+        course = select_form.cleaned_data['course']
+        date = select_form.cleaned_data['date']
+        enrollments = list(Enrollment.objects.for_listing().filter(course=course, status='active')
+                           .order_by('student__first_name', 'student__last_name', 'id'))
+        
+        if request.method == 'POST':
+            roster_form = RosterAttendanceForm(request.POST, enrollments=enrollments)
+            if roster_form.is_valid():
+                records = [
+                    Attendance(enrollment_id=enrollment_id, date=date, status=status, marked_by=request.user)
+                    for enrollment_id, status in roster_form.statuses().items()
+                ]
+                with transaction.atomic():
+                    Attendance.objects.bulk_create(
+                        records, update_conflicts=True,
+                        unique_fields=['enrollment', 'date'], update_fields=['status', 'marked_by'],
+                    )
+                messages.success(request, f'Attendance saved for {len(records)} students in {course.name}.')
+                return redirect(f"{request.path}?{request.GET.urlencode()}")
+        else:
+            marked = dict(Attendance.objects.filter(enrollment__in=enrollments, date=date)
+                          .values_list('enrollment_id', 'status'))
+            roster_form = RosterAttendanceForm(
+                enrollments=enrollments,
+                initial={f'status_{enrollment_id}': status for enrollment_id, status in marked.items()},
+            )
+    
+    return render(request, 'trainer/roster_attendance.html', {'select_form': select_form, 'roster_form': roster_form})
+
+
+@role_required('trainer')
 def trainer_update_progress(request, enrollment_id):
-    if request.user.user_type != 'trainer':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    enrollment = get_object_or_404(Enrollment, id=enrollment_id, course__trainer=request.user)
+    enrollment = get_object_or_404(Enrollment.objects.for_listing(), id=enrollment_id, course__trainer=request.user)
     
     if request.method == 'POST':
         progress = request.POST.get('progress_percentage')
         if progress:
             enrollment.progress_percentage = int(progress)
-            enrollment.save()
+            enrollment.save(update_fields=['progress_percentage'])
             messages.success(request, 'Progress updated successfully!')
             return redirect('trainer_view_students')
     
@@ -349,32 +556,21 @@ def trainer_update_progress(request, enrollment_id):
 
 
 # ============= MANAGER VIEWS =============
-@login_required
-def manager_dashboard(request):
-    if request.user.user_type != 'manager':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    total_students = User.objects.filter(user_type='student').count()
-    total_trainers = User.objects.filter(user_type='trainer').count()
-    total_courses = Course.objects.count()
-    total_enrollments = Enrollment.objects.filter(status='active').count()
+@role_required('manager')
+async def manager_dashboard(request):
+    stats = await PlatformStats.acurrent()
     
     context = {
-        'total_students': total_students,
-        'total_trainers': total_trainers,
-        'total_courses': total_courses,
-        'total_enrollments': total_enrollments,
+        'total_students': stats.total_students,
+        'total_trainers': stats.total_trainers,
+        'total_courses': stats.total_courses,
+        'total_enrollments': stats.total_enrollments,
     }
-    return render(request, 'manager/dashboard.html', context)
+    return await _arender(request, 'manager/dashboard.html', context)
 
 
-@login_required
+@role_required('manager')
 def manager_add_course(request):
-    if request.user.user_type != 'manager':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
     if request.method == 'POST':
         form = CourseForm(request.POST)
         if form.is_valid():
@@ -388,22 +584,14 @@ def manager_add_course(request):
     return render(request, 'manager/add_course.html', {'form': form})
 
 
-@login_required
+@role_required('manager')
 def manager_manage_courses(request):
-    if request.user.user_type != 'manager':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    courses = Course.objects.all()
+    courses = Course.objects.for_listing()
     return render(request, 'manager/manage_courses.html', {'courses': courses})
 
 
-@login_required
+@role_required('manager')
 def manager_allot_trainer(request, course_id):
-    if request.user.user_type != 'manager':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
     course = get_object_or_404(Course, id=course_id)
     
     if request.method == 'POST':
@@ -419,48 +607,37 @@ def manager_allot_trainer(request, course_id):
     return render(request, 'manager/allot_trainer.html', {'form': form, 'course': course})
 
 
-@login_required
-def manager_view_feedbacks(request):
-    if request.user.user_type != 'manager':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    feedbacks = Feedback.objects.all()
-    avg_rating = feedbacks.aggregate(Avg('rating'))['rating__avg']
+@role_required('manager')
+@replica_reads
+async def manager_view_feedbacks(request):
+    feedbacks = await sync_to_async(paginate_keyset)(Feedback.objects.for_listing(), request, '-created_at')
+    totals = await Course.objects.aaggregate(rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'))
+    avg_rating = totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else 0
     
     context = {
         'feedbacks': feedbacks,
         'avg_rating': round(avg_rating, 2) if avg_rating else 0,
     }
-    return render(request, 'manager/view_feedbacks.html', context)
+    return await _arender(request, 'manager/view_feedbacks.html', context)
 
 
-@login_required
-def manager_analyse_progress(request):
-    if request.user.user_type != 'manager':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    enrollments = Enrollment.objects.filter(status='active')
-    courses = Course.objects.annotate(
-        avg_progress=Avg('enrollments__progress_percentage'),
-        student_count=Count('enrollments', filter=Q(enrollments__status='active'))
-    )
+@role_required('manager')
+@replica_reads
+async def manager_analyse_progress(request):
+    enrollments = await sync_to_async(paginate_keyset)(
+        Enrollment.objects.for_listing().filter(status='active'), request, '-enrollment_date')
+    courses = await _alist(Course.objects.for_listing())
     
     context = {
         'enrollments': enrollments,
         'courses': courses,
     }
-    return render(request, 'manager/analyse_progress.html', context)
+    return await _arender(request, 'manager/analyse_progress.html', context)
 
 
-@login_required
+@role_required('manager')
 def manager_update_payment(request, payment_id):
-    if request.user.user_type != 'manager':
-        messages.error(request, 'Access denied.')
-        return redirect('home')
-    
-    payment = get_object_or_404(Payment, id=payment_id)
+    payment = get_object_or_404(Payment.objects.for_listing(), id=payment_id)
     
     if request.method == 'POST':
         form = UpdatePaymentForm(request.POST, instance=payment)
@@ -474,11 +651,82 @@ def manager_update_payment(request, payment_id):
     return render(request, 'manager/update_payment.html', {'form': form, 'payment': payment})
 
 
-@login_required
+@role_required('manager')
+@replica_reads
 def manager_view_payments(request):
-    if request.user.user_type != 'manager':
+    payments = Payment.objects.for_listing()
+    status = request.GET.get('status')
+    if status:
+        payments = payments.filter(status=status)
+    
+    context = {
+        'payments': paginate_keyset(payments, request, '-payment_date'),
+        'status': status,
+        'status_choices': Payment.PAYMENT_STATUS_CHOICES,
+    }
+    return render(request, 'manager/view_payments.html', context)
+
+
+@role_required('manager')
+def manager_export(request, dataset):
+    export = EXPORTS.get(dataset)
+    if export is None:
+        raise Http404('Unknown export')
+    
+    form = ExportForm(request.GET, export=export)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    
+    fmt = form.cleaned_data['format']
+    rows = export.queryset(**form.filters())
+    stream = astream_rows if isinstance(request, ASGIRequest) else stream_rows
+    response = StreamingHttpResponse(stream(export, rows, fmt), content_type=CONTENT_TYPES[fmt])
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{dataset}-{stamp}.{fmt}"'
+    return response
+
+
+# ============= PROTECTED MEDIA =============
+# Uploaded files are only reachable through these views, which check access
+# and then hand the transfer to the front server (see PROTECTED_MEDIA).
+@login_required
+def download_submission(request, submission_id):
+    submission = get_object_or_404(Submission.objects.select_related('student', 'assignment__course'),
+                                   id=submission_id)
+    user = request.user
+    assignment = submission.assignment
+    allowed = (
+        user.user_type == 'manager'
+        or submission.student_id == user.id
+        or (user.user_type == 'trainer' and user.id in (assignment.course.trainer_id, assignment.created_by_id))
+    )
+    if not allowed:
         messages.error(request, 'Access denied.')
         return redirect('home')
+    if not submission.submission_file:
+        raise Http404('No submitted file')
     
-    payments = Payment.objects.all()
-    return render(request, 'manager/view_payments.html', {'payments': payments})
\ No newline at end of file
+    extension = os.path.splitext(submission.submission_file.name)[1]
+    filename = f'{slugify(submission.student.username)}-{slugify(assignment.title)}{extension}'
+    return serve_media(request, submission.submission_file, filename=filename, as_attachment=True)
+
+
+@login_required
+def profile_picture(request, user_id, size=None, fmt=None):
+    user = get_object_or_404(User.objects.only('id', 'profile_picture'), id=user_id)
+    picture = user.profile_picture
+    if not picture:
+        raise Http404('No profile picture')
+    if size is not None:
+        if size not in thumbnail_settings()['SIZES'] or fmt not in thumbnail_settings()['FORMATS']:
+            raise Http404('Unknown thumbnail')
+        variant = variant_name(picture.name, size, fmt)
+        if not picture.storage.exists(variant):
+            # Until the background task has written the variant, send the
+            # original, but make the browser ask again next time instead of
+            # caching the full-size image under the thumbnail's URL.
+            response = serve_media(request, picture)
+            patch_cache_control(response, no_cache=True, max_age=0)
+            return response
+        picture = type(picture)(user, picture.field, variant)
+    return serve_media(request, picture)
@@ -46,9 +46,11 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'e_learning_app.middleware.PrincipalAuthenticationMiddleware',
+    'e_learning_app.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'e_learning_app.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'e_learning_platform.urls'
@@ -77,13 +79,92 @@ WSGI_APPLICATION = 'e_learning_platform.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Tuned for several gunicorn workers writing at once; compare against the
+# stock settings with `manage.py write_contention`.
+# - WAL lets readers run alongside the single writer; synchronous=NORMAL is
+#   durable across application crashes and skips an fsync per commit.
+# - BEGIN IMMEDIATE takes the write lock up front, so a transaction that
+#   reads before it writes waits its turn (busy_timeout) instead of failing
+#   at once with "database is locked" when another writer got in first.
+# - mmap_size (256 MiB) and cache_size (64 MiB per connection) keep hot pages in memory.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+REPLICA_SNAPSHOT = BASE_DIR / 'db.replica.sqlite3'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            'init_command': '; '.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        },
+        # A file rather than SQLite's shared in-memory database, whose table
+        # locks fail concurrent writers at once instead of letting them wait
+        # out busy_timeout; EnrollmentRaceTests writes from several threads.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    },
+    # Read replica for heavy manager reads (e_learning_app.replica). Locally a
+    # read-only snapshot of the primary, refreshed by `manage.py sync_replica`;
+    # until the file exists, replica reads fall back to the primary.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{REPLICA_SNAPSHOT}?mode=ro',
+        'OPTIONS': {
+            'uri': True,
+            'init_command': 'PRAGMA query_only=1; PRAGMA mmap_size=268435456; PRAGMA cache_size=-65536',
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['e_learning_app.replica.ReplicaRouter']
+
+REPLICA = {
+    'ALIAS': 'replica',
+    'PIN_SECONDS': 10,
+    'PIN_COOKIE': 'replica_pin',
+    'RETRY_SECONDS': 30,
+    'SNAPSHOT_PATH': REPLICA_SNAPSHOT,
+}
+
+
+# Caches
+# The course catalog lives in a file-based cache so every worker process sees
+# the same catalog version and a Course write invalidates it everywhere.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'catalog',
+    },
+    # Sessions and auth principals (e_learning_app.auth). It must be shared
+    # by all workers, or a logout or password change would not reach them;
+    # point it at Redis or Memcached when running on more than one host.
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'auth',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
 
+# Sessions
+# Read from the 'auth' cache and written through to the database, so an
+# authenticated request does not query django_session. Use
+# 'django.contrib.sessions.backends.signed_cookies' to keep no server state at all.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'auth'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,11 +212,86 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# File storages
+# Submission uploads are content-addressed: identical files are stored once
+# and reference-counted (e_learning_app.storage.ContentAddressedStorage).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'submissions': {
+        'BACKEND': 'e_learning_app.storage.ContentAddressedStorage',
+    },
+}
+
+# Protected media (e_learning_app.media.serve_media). Set SERVER to
+# 'x-accel-redirect' behind nginx or 'x-sendfile' behind Apache/lighttpd so
+# the front server streams the file after Django has checked access.
+PROTECTED_MEDIA = {
+    'SERVER': os.environ.get('PROTECTED_MEDIA_SERVER') or None,
+    'ACCEL_PREFIX': '/protected-media/',
+    'MAX_AGE': 60 * 60,
+}
+
+# Profile picture thumbnails (e_learning_app.thumbnails). Square variants
+# are written by a background task after upload; backfill them with
+# `manage.py generate_thumbnails`. Templates use {% avatar user size %}.
+THUMBNAILS = {
+    'SIZES': (32, 64, 128, 256),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+}
+
+# Background tasks (e_learning_app.tasks), run by `manage.py run_tasks`.
+TASKS = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 5,
+    'BACKOFF_MAX': 60 * 60,
+    'VISIBILITY_TIMEOUT': 10 * 60,
+    'KEEP_DONE_HOURS': 24,
+}
+
+# Resumable chunked uploads (student_start_upload and friends). Part files
+# live outside MEDIA_ROOT until finalized; `manage.py clear_stale_uploads`
+# drops uploads left untouched for EXPIRE_HOURS.
+CHUNKED_UPLOADS = {
+    'DIR': BASE_DIR / 'uploads',
+    'CHUNK_SIZE': 8 * 1024 * 1024,
+    'MAX_SIZE': 2 * 1024 * 1024 * 1024,
+    'EXPIRE_HOURS': 24,
+}
+
 # Login URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
+# Query budgets (e_learning_app.middleware.QueryBudgetMiddleware)
+# Per-view query limits keyed by URL name. With ENFORCE on, a request that
+# goes over its budget raises instead of rendering, so regressions fail in
+# dev and in tests. Summarise LOG_FILE with `manage.py query_report`.
+QUERY_BUDGET = {
+    'ENABLED': DEBUG,
+    'ENFORCE': os.environ.get('QUERY_BUDGET_ENFORCE') == '1',
+    'DEFAULT': 50,
+    'VIEWS': {
+        'home': 5,
+        'manager_dashboard': 10,
+        'manager_view_payments': 10,
+        'manager_view_feedbacks': 10,
+        'manager_analyse_progress': 10,
+        'trainer_dashboard': 10,
+        'trainer_view_students': 10,
+        'trainer_view_submissions': 10,
+        'student_view_assignments': 10,
+    },
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'LOG_FILE': os.environ.get('QUERY_BUDGET_LOG'),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -24,6 +24,7 @@ urlpatterns = [
     path('', include('e_learning_app.urls')),
 ]
 
+# Uploaded media is not served here even in DEBUG; it goes through the
+# access-checked views in e_learning_app (download_submission, profile_picture).
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file